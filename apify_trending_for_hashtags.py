@@ -1,43 +1,116 @@
 import os
 import re
+import asyncio
+import random
 import time
 import sys
-import io
 import ast
+import json
 import logging
-from contextlib import contextmanager
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from apify_client import ApifyClient
+from functools import lru_cache
+from urllib.parse import unquote_plus, urlparse, parse_qs
+from apify_client import ApifyClient, ApifyClientAsync
+from requests.adapters import HTTPAdapter
+from tools.cache import FileCache
+# optional: linear-time vocabulary matching (non-fatal if missing)
+try:
+    import ahocorasick
+except Exception:
+    ahocorasick = None
 
 # ------------- Configuration -------------
 # Tune these if you need fewer/more retries or longer timeouts
 APIFY_CALL_RETRIES = 3
 APIFY_CALL_BACKOFF_SECONDS = 2
+# Upper bound (seconds) for a single jittered backoff sleep
+_JITTER_CAP = 30
 # Max pages per query passed to the actor (keeps each actor run short)
 MAX_PAGES_PER_QUERY = 1
+# Queries sent to the Google actor per run (amortizes actor start-up across queries)
+APIFY_BATCH_SIZE = 10
+# Max number of actor runs processed concurrently (actor runs are network-bound)
+APIFY_MAX_WORKERS = 16
+# Max in-flight actor runs for the asyncio variant
+APIFY_ASYNC_CONCURRENCY = 20
+# Successful runs in a row before the asyncio variant raises its concurrency again
+APIFY_SCALE_UP_WINDOW = 5
+# Keep-alive connections kept open to api.apify.com by the shared client
+APIFY_POOL_SIZE = 64
+# Per-query hashtag counts are reused for this long (seconds); 0 disables the cache
+APIFY_QUERY_CACHE_TTL = int(os.getenv("APIFY_QUERY_CACHE_TTL", str(24 * 3600)))
+# SQLite file (see tools/cache.py), anchored to this module rather than the working directory
+APIFY_QUERY_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "cache", "apify_queries.sqlite")
+# Actor IDs used for trending lookups
+ACTORS = {
+    "google": "apify/google-search-scraper",
+}
+# Per-batch progress lines; set APIFY_VERBOSE=0 to keep only the summary
+_VERBOSE = os.getenv("APIFY_VERBOSE", "1") != "0"
 # -----------------------------------------
 
-# Minimal logging for the script; suppress noisy libraries
+# Patterns used on every normalized input / dataset item
+_TITLE_RE = re.compile(r"(?:'|\")?title(?:'|\")?\s*:\s*(?:'|\")([^'\"]+)(?:'|\")")
+_Q_RE = re.compile(r"[?&]q=([^&\s]+)")
+_HASHTAG_RE = re.compile(r"#\w+")
+
+# Dict fields tried (in priority order) when normalizing a dict input
+_PRIORITY_KEYS = ("title", "text", "query", "q", "searchQuery", "snippet")
+
+# Minimal logging for the script; suppress noisy libraries. The Apify client
+# reports actor run logs and retries through these loggers, so silencing them
+# once here replaces redirecting stdout/stderr around every call (which isn't
+# safe once actor calls run on several threads).
 logging.getLogger().setLevel(logging.ERROR)
 for logger_name in ("apify", "playwright", "urllib3"):
     logging.getLogger(logger_name).setLevel(logging.ERROR)
+for logger_name in ("apify_client", "apify_client.clients.base", "apify_client.clients.resource_clients"):
+    logging.getLogger(logger_name).setLevel(logging.CRITICAL)
 
-@contextmanager
-def suppress_stdout_stderr():
-    """Temporarily redirect stdout and stderr to devnull."""
-    new_stdout, new_stderr = io.StringIO(), io.StringIO()
-    old_stdout, old_stderr = sys.stdout, sys.stderr
-    try:
-        sys.stdout, sys.stderr = new_stdout, new_stderr
-        yield
-    finally:
-        sys.stdout, sys.stderr = old_stdout, old_stderr
+# Serializes progress output from worker threads
+_PRINT_LOCK = threading.Lock()
+
+# query -> {hashtag: count} from earlier actor runs (discovery mode only);
+# opened on first use by _get_query_cache
+_query_cache = None
+_QUERY_CACHE_LOCK = threading.Lock()
+
+@lru_cache(maxsize=1)
+def get_shared_client(api_key=None):
+    """
+    Return a process-wide ApifyClient for `api_key` (defaults to APIFY_API_TOKEN),
+    so actor polling and dataset reads reuse the same keep-alive connections
+    across calls and across web requests.
+    """
+    client = ApifyClient(api_key or os.getenv("APIFY_API_TOKEN"))
+    # Older apify-client releases sit on a requests.Session whose default
+    # pool holds 10 connections; widen it to match our worker count.
+    # Newer httpx-based releases are left as they are.
+    session = getattr(getattr(client, "http_client", None), "requests_session", None)
+    if session is not None and hasattr(session, "mount"):
+        adapter = HTTPAdapter(pool_connections=APIFY_POOL_SIZE, pool_maxsize=APIFY_POOL_SIZE, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    return client
+
+def _log(message):
+    """Print a progress line without interleaving output from other threads."""
+    with _PRINT_LOCK:
+        print(message)
 
 def _try_literal_eval(s):
-    """Safely parse a string that might contain a Python literal dict."""
+    """Safely parse a string that might contain a JSON object or Python literal dict."""
+    # JSON is parsed in C; only fall back to the AST walk for Python-style
+    # literals (single quotes, True/None, ...)
+    try:
+        return json.loads(s)
+    except Exception:
+        pass
     try:
-        parsed = ast.literal_eval(s)
-        return parsed
+        return ast.literal_eval(s)
     except Exception:
         return None
 
@@ -55,31 +128,36 @@ def normalize_query_item(tag):
     # If it's already a string, trim and return
     if isinstance(tag, str):
         s = tag.strip()
+        # fast path: plain '#hashtag' strings are by far the most common input
+        if not s or s[0] == "#":
+            return s
         # try parse stringified dict first if it looks like one
-        if s.startswith("{") and ":" in s:
+        if s[0] == "{" and ":" in s:
             parsed = _try_literal_eval(s)
             if isinstance(parsed, dict):
                 return normalize_query_item(parsed)
             # regex fallback: extract title or q param
-            import re, urllib.parse
-            m = re.search(r"(?:'|\")?title(?:'|\")?\s*:\s*(?:'|\")([^'\"]+)(?:'|\")", s)
+            m = _TITLE_RE.search(s)
             if m:
                 return m.group(1).strip()
-            m2 = re.search(r"[?&]q=([^&\s]+)", s)
+            m2 = _Q_RE.search(s)
             if m2:
-                return urllib.parse.unquote_plus(m2.group(1)).strip()
+                return unquote_plus(m2.group(1)).strip()
         return s
 
     # If it's a dict, try common fields
     if isinstance(tag, dict):
-        for key in ("title", "text", "query", "q", "searchQuery", "snippet"):
-            if key in tag and isinstance(tag[key], str) and tag[key].strip():
-                return tag[key].strip()
+        for key in _PRIORITY_KEYS:
+            v = tag.get(key)
+            if isinstance(v, str):
+                v = v.strip()
+                if v:
+                    return v
         # try extracting q from url
-        if "url" in tag and isinstance(tag["url"], str):
+        url = tag.get("url")
+        if isinstance(url, str):
             try:
-                from urllib.parse import urlparse, parse_qs, unquote_plus
-                p = urlparse(tag["url"])
+                p = urlparse(url)
                 qs = parse_qs(p.query)
                 if "q" in qs and qs["q"]:
                     return unquote_plus(qs["q"][0]).strip()
@@ -97,26 +175,8 @@ def normalize_query_item(tag):
     except Exception:
         return ""
 
-def get_trending_hashtags_for_list(hashtags, num_results=1):
-    """
-    For each hashtag/keyword in `hashtags`, run Apify's Google Search Scraper actor,
-    extract hashtags from the actor results, and return a list of unique hashtags.
-
-    Args:
-      hashtags: iterable of strings/dicts (keywords or hashtags)
-      num_results: reserved for compatibility (not used by this actor wrapper)
-
-    Returns:
-      List[str] - unique hashtags found (e.g., '#AI', '#MachineLearning')
-    """
-    api_key = os.getenv("APIFY_API_TOKEN")
-    if not api_key:
-        raise ValueError("APIFY_API_TOKEN not set in environment variables.")
-
-    client = ApifyClient(api_key)
-    hashtag_pattern = re.compile(r"#\w+")
-    trending = set()
-
+def _normalize_inputs(hashtags):
+    """Normalize and dedupe the '#'-prefixed inputs into search queries (order preserved)."""
     # Only process hashtags from Gemini, not keywords
     normalized = []
     seen = set()
@@ -132,105 +192,479 @@ def get_trending_hashtags_for_list(hashtags, num_results=1):
             if q not in seen:
                 seen.add(q)
                 normalized.append(q)
+    return normalized
+
+def _item_counts(item, search_inputs, per_query):
+    """
+    Return the counter that a dataset item's hashtags belong to, using the
+    item's `searchQuery.term` to map it back to the query that produced it.
+    Returns None for items whose term is missing or isn't one of `search_inputs`.
+    """
+    search_query = item.get("searchQuery")
+    term = search_query.get("term") if isinstance(search_query, dict) else None
+    key = search_inputs.get(term)
+    if key is None:
+        return None
+    counts = per_query.get(key)
+    if counts is None:
+        counts = per_query[key] = Counter()
+    return counts
+
+# Text fields scanned on each organic search result
+_ORGANIC_FIELDS = ("title", "snippet", "description", "plainText", "text")
+
+def _item_texts(item):
+    """Yield every text field of a dataset item that may contain hashtags."""
+    # Organic results: title & snippet & description and other text fields
+    organic = item.get("organicResults") or []
+    for result in organic:
+        # Sometimes results aren't dicts (rare); we intentionally don't crash
+        # if the structure is unexpected
+        if isinstance(result, dict):
+            for field in _ORGANIC_FIELDS:
+                val = result.get(field)
+                if isinstance(val, str):
+                    yield val
+
+    # Related queries (could be strings or dicts with 'text' or 'query')
+    related = item.get("relatedQueries") or []
+    for r in related:
+        if isinstance(r, str):
+            yield r
+        elif isinstance(r, dict):
+            text_to_check = r.get("text") or r.get("query") or r.get("title") or ""
+            if isinstance(text_to_check, str):
+                yield text_to_check
+        else:
+            yield str(r)
+
+    # Some actors provide aiMode/aiOverview fields; scan them safely
+    for ai_field in ("aiOverview", "aiModeResults", "aiOverviews"):
+        ai_val = item.get(ai_field)
+        if isinstance(ai_val, str):
+            yield ai_val
+        elif isinstance(ai_val, list):
+            for sub in ai_val:
+                if isinstance(sub, str):
+                    yield sub
+
+def _build_vocab_matcher(vocabulary):
+    """
+    Build a `blob -> list[str]` matcher that only reports hashtags from `vocabulary`.
+
+    Uses a pyahocorasick automaton when available (one linear scan regardless of
+    vocabulary size), otherwise a single compiled alternation regex. A tag only
+    matches as a whole hashtag, so '#AI' does not match inside '#AIResearch'.
+    """
+    tags = set()
+    for v in vocabulary:
+        t = str(v).strip()
+        if t.lstrip("#"):
+            tags.add(t if t.startswith("#") else "#" + t)
+    if not tags:
+        return lambda blob: []
 
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for tag in tags:
+            automaton.add_word(tag, tag)
+        automaton.make_automaton()
+
+        def _match(blob):
+            n = len(blob)
+            out = []
+            for end, tag in automaton.iter(blob):
+                nxt = end + 1
+                if nxt == n or not (blob[nxt].isalnum() or blob[nxt] == "_"):
+                    out.append(tag)
+            return out
+        return _match
+
+    # Longest tags first so the alternation prefers the most specific match
+    alternation = "|".join(re.escape(t) for t in sorted(tags, key=len, reverse=True))
+    return re.compile(rf"(?:{alternation})(?!\w)").findall
+
+def _count_item_hashtags(item, counts, match=_HASHTAG_RE.findall):
+    """
+    Add the hashtags found in one actor dataset item to `counts` (in place).
+    `match` maps a text blob to its hashtags (discovery regex by default).
+    """
+    # One regex pass over all fields; the newline separator can't be part of a
+    # hashtag, so matches never span two fields.
+    blob = "\n".join(_item_texts(item))
+    # The same few tags recur across thousands of items; interning lets every
+    # occurrence share one string object and hit dict lookups by identity.
+    counts.update(map(sys.intern, match(blob)))
+
+def _search_input(query_text):
+    """Turn a normalized hashtag query into the Google search string we send."""
+    # remove leading '#' if present (we search keywords, not hashtag tokens)
+    return f"trending hashtags for {query_text.lstrip('#').strip()}"
+
+def _batches(normalized):
+    """Split the normalized queries into chunks of APIFY_BATCH_SIZE."""
+    size = max(1, APIFY_BATCH_SIZE)
+    return [normalized[i:i + size] for i in range(0, len(normalized), size)]
+
+def _google_run_input(search_inputs):
+    """Build the Google Search Scraper run input for a batch of search strings."""
+    return {
+        # The actor takes one query per line and runs them all in a single container
+        "queries": "\n".join(search_inputs),
+        "maxPagesPerQuery": MAX_PAGES_PER_QUERY,
+        "languageCode": "en",
+        "mobileResults": False,
+        "includeUnfilteredResults": True
+    }
+
+def _backoff_delay(attempt):
+    """
+    Full-jitter backoff for a zero-based `attempt`: a uniform draw from
+    [0, min(_JITTER_CAP, APIFY_CALL_BACKOFF_SECONDS * 2**attempt)], so parallel
+    workers that hit the same rate limit don't all retry at the same instant.
+    """
+    return random.uniform(0, min(_JITTER_CAP, APIFY_CALL_BACKOFF_SECONDS * (2 ** attempt)))
+
+# ActorClient handles keyed by (client, actor_id); built once, reused per call/retry
+_ACTOR_HANDLES = {}
+
+def _get_actor(client, actor_id):
+    """Return a cached `client.actor(actor_id)` handle."""
+    key = (client, actor_id)
+    handle = _ACTOR_HANDLES.get(key)
+    if handle is None:
+        handle = _ACTOR_HANDLES.setdefault(key, client.actor(actor_id))
+    return handle
+
+def _retry_call(fn, *args):
+    """Call `fn(*args)` up to APIFY_CALL_RETRIES times; re-raise the last error."""
+    last_exc = None
+    for attempt in range(APIFY_CALL_RETRIES):
+        try:
+            return fn(*args)
+        except Exception as exc:
+            last_exc = exc
+            if attempt + 1 < APIFY_CALL_RETRIES:
+                time.sleep(_backoff_delay(attempt))
+    raise last_exc
+
+def _call_actor(client, actor_id, run_input):
+    """
+    Call an Apify actor with jittered retries. Re-raises the last exception if
+    every attempt fails.
+    """
+    actor = _get_actor(client, actor_id)
+    return _retry_call(lambda: actor.call(run_input=run_input))
+
+def _process_batch(batch, client, match=_HASHTAG_RE.findall):
+    """
+    Run the Google Search Scraper actor once for a batch of queries and count
+    the hashtags found for each query.
+
+    Returns:
+      (dict[str, Counter], float | None) - hashtag counts keyed by query, holding
+      only queries that got dataset items back, and the batch duration in seconds
+      (None if the actor run or dataset read failed)
+    """
+    search_inputs = {_search_input(q): q for q in batch}
+    b_start = time.perf_counter()
+    per_query = {}
+
+    try:
+        run = _call_actor(client, ACTORS["google"], _google_run_input(list(search_inputs)))
+    except Exception as exc:
+        _log(f"Apify error for {list(search_inputs)}: {exc}")
+        return per_query, None
+
+    dataset_id = run.get("defaultDatasetId") if run else None
+    if not dataset_id:
+        _log(f"Apify run returned no dataset for {list(search_inputs)}")
+        return per_query, None
+
+    # Stream dataset items and extract hashtags from
+    # organicResults, relatedQueries, snippets etc. page by page as they arrive
+    try:
+        for item in client.dataset(dataset_id).iterate_items():
+            counts = _item_counts(item, search_inputs, per_query)
+            if counts is not None:
+                _count_item_hashtags(item, counts, match)
+    except Exception as exc:
+        _log(f"Failed to read Apify dataset for {list(search_inputs)}: {exc}")
+        return per_query, None
+
+    return per_query, time.perf_counter() - b_start
+
+def _get_query_cache():
+    """The per-query counts cache, or None when APIFY_QUERY_CACHE_TTL disables it."""
+    global _query_cache
+    if APIFY_QUERY_CACHE_TTL <= 0:
+        return None
+    if _query_cache is None:
+        with _QUERY_CACHE_LOCK:
+            if _query_cache is None:
+                _query_cache = FileCache(APIFY_QUERY_CACHE_PATH, default_ttl=APIFY_QUERY_CACHE_TTL)
+    return _query_cache
+
+def _cached_counts(normalized, vocabulary, use_cache=True):
+    """
+    Split `normalized` into ({query: Counter} served from the query cache, queries
+    still to send). Vocabulary-filtered runs count differently, so they always
+    go to Apify; so does everything when `use_cache` is False.
+    """
+    if not use_cache or vocabulary is not None:
+        return {}, normalized
+    cache = _get_query_cache()
+    if cache is None:
+        return {}, normalized
+    cached, pending = {}, []
+    for q in normalized:
+        hit = cache.get(q)
+        if hit is None:
+            pending.append(q)
+        else:
+            cached[q] = Counter(hit)
+    print(f"cache: {len(cached)}/{len(normalized)} hits")
+    return cached, pending
+
+def _store_counts(per_query, vocabulary):
+    """
+    Remember the counts of a successful batch. `per_query` only holds queries that
+    got dataset items back, so a query the run produced nothing for isn't pinned
+    as "no hashtags" for the whole TTL.
+    """
+    if vocabulary is not None:
+        return
+    cache = _get_query_cache()
+    if cache is None:
+        return
+    try:
+        cache.set_many((q, dict(c)) for q, c in per_query.items())
+    except Exception as exc:
+        _log(f"Failed to cache Apify counts: {exc}")
+
+def get_trending_hashtags_for_list(hashtags, num_results=1, vocabulary=None, client=None, use_cache=True):
+    """
+    Search Google for each hashtag in `hashtags` via Apify's Google Search Scraper
+    actor (APIFY_BATCH_SIZE queries per actor run), extract hashtags from the actor
+    results, and return a list of unique hashtags.
+
+    Args:
+      hashtags: iterable of strings/dicts (keywords or hashtags)
+      num_results: reserved for compatibility (not used by this actor wrapper)
+      vocabulary: optional iterable of allowed hashtags; when given, only these
+        are counted (discovery mode otherwise)
+      client: optional ApifyClient to use instead of `get_shared_client()`
+      use_cache: when False, every query goes to Apify (fresh counts still refresh the cache)
+
+    Returns:
+      List[str] - unique hashtags found, most frequent first (e.g., '#AI', '#MachineLearning')
+    """
+    api_key = os.getenv("APIFY_API_TOKEN")
+    if not api_key:
+        raise ValueError("APIFY_API_TOKEN not set in environment variables.")
+
+    if client is None:
+        client = get_shared_client(api_key)
+    match = _build_vocab_matcher(vocabulary) if vocabulary is not None else _HASHTAG_RE.findall
+
+    normalized = _normalize_inputs(hashtags)
     total_queries = len(normalized)
     if total_queries == 0:
         return []
 
-    print(f"\nStarting hashtag search at {datetime.now().strftime('%H:%M:%S')}")
+    if _VERBOSE:
+        print(f"\nStarting hashtag search at {datetime.now().strftime('%H:%M:%S')}")
     print(f"Total queries to process: {total_queries}\n")
 
-    start_time = time.time()
-    processed = 0
+    start_time = time.perf_counter()
+    trending = Counter()
+    cached, pending = _cached_counts(normalized, vocabulary, use_cache)
+    for counts in cached.values():
+        trending.update(counts)
+    processed = len(cached)
 
-    for query_text in normalized:
-        # remove leading '#' if present (we search keywords, not hashtag tokens)
-        search_phrase = query_text.lstrip("#").strip()
-        search_input = f"trending hashtags for {search_phrase}"
-        processed += 1
-        q_start = time.time()
+    batches = _batches(pending)
+    max_workers = max(1, min(APIFY_MAX_WORKERS, len(batches)))
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futures = {ex.submit(_process_batch, b, client, match): b for b in batches}
+        for fut in as_completed(futures):
+            batch = futures[fut]
+            per_query, b_duration = fut.result()
+            for counts in per_query.values():
+                trending.update(counts)
+            processed += len(batch)
+            if b_duration is None:
+                continue
+            _store_counts(per_query, vocabulary)
+            if not _VERBOSE:
+                continue
+            for query_text in batch:
+                search_phrase = query_text.lstrip("#").strip()
+                _log(f"Processed '{search_phrase}': {len(per_query.get(query_text, {}))} hashtags")
+            _log(f"Batch of {len(batch)} queries ({processed}/{total_queries}) finished in {b_duration:.2f}s")
 
-        # Call the actor with retries and suppress actor stdout/stderr
-        run = None
-        last_exc = None
-        for attempt in range(1, APIFY_CALL_RETRIES + 1):
-            try:
-                run_input = {
-                    "queries": search_input,
-                    "maxPagesPerQuery": MAX_PAGES_PER_QUERY,
-                    "languageCode": "en",
-                    "mobileResults": False,
-                    "includeUnfilteredResults": True
-                }
-                with suppress_stdout_stderr():
-                    run = client.actor("apify/google-search-scraper").call(run_input=run_input)
-                last_exc = None
-                break
-            except Exception as exc:
-                last_exc = exc
-                sleep_time = APIFY_CALL_BACKOFF_SECONDS * (2 ** (attempt - 1))
-                time.sleep(sleep_time)
-
-        if last_exc and run is None:
-            print(f"Apify error for '{search_input}': {last_exc}")
-            continue
+    total_duration = time.perf_counter() - start_time
+    avg = total_duration / total_queries if total_queries else 0.0
+    print(f"\nFinished processing all queries in {total_duration:.2f} seconds")
+    print(f"Average time per query: {avg:.2f} seconds")
+    print(f"Total unique hashtags found: {len(trending)}\n")
+
+    return [tag for tag, _ in trending.most_common()]
+
+class _AdaptiveConcurrency:
+    """
+    Concurrency target shared by the asyncio workers, in the spirit of Apify's
+    AutoscaledPool: back off by one worker on every rate-limit error and add
+    one back after APIFY_SCALE_UP_WINDOW successful runs in a row.
+    """
+
+    def __init__(self, maximum):
+        self.maximum = max(1, maximum)
+        self.desired = self.maximum
+        self._successes = 0
+
+    def on_rate_limited(self):
+        self.desired = max(1, self.desired - 1)
+        self._successes = 0
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= APIFY_SCALE_UP_WINDOW:
+            self.desired = min(self.maximum, self.desired + 1)
+            self._successes = 0
 
-        # Retrieve dataset items (suppress actor logs)
-        dataset_items = []
+def _is_rate_limited(exc):
+    """True if an Apify client error is an HTTP 429."""
+    return getattr(exc, "status_code", None) == 429
+
+async def _call_actor_async(client, actor_id, run_input, limit=None):
+    """
+    Async counterpart of `_call_actor` for an `ApifyClientAsync`. Rate-limit
+    errors are reported to `limit` (an `_AdaptiveConcurrency`) when given.
+    """
+    # The async client is per call (it is bound to the running event loop),
+    # so build the handle once per run rather than through the global cache
+    actor = client.actor(actor_id)
+    last_exc = None
+    for attempt in range(APIFY_CALL_RETRIES):
         try:
-            with suppress_stdout_stderr():
-                dataset_items = list(client.dataset(run.get("defaultDatasetId", "")).iterate_items())
+            return await actor.call(run_input=run_input)
         except Exception as exc:
-            print(f"Failed to read Apify dataset for '{search_input}': {exc}")
+            last_exc = exc
+            if limit is not None and _is_rate_limited(exc):
+                limit.on_rate_limited()
+            if attempt + 1 < APIFY_CALL_RETRIES:
+                await asyncio.sleep(_backoff_delay(attempt))
+    raise last_exc
+
+async def _process_batch_async(batch, client, match=_HASHTAG_RE.findall, limit=None):
+    """Async counterpart of `_process_batch`."""
+    search_inputs = {_search_input(q): q for q in batch}
+    per_query = {}
+    b_start = time.perf_counter()
+
+    try:
+        run = await _call_actor_async(client, ACTORS["google"], _google_run_input(list(search_inputs)), limit)
+    except Exception as exc:
+        _log(f"Apify error for {list(search_inputs)}: {exc}")
+        return per_query, None
+
+    dataset_id = run.get("defaultDatasetId") if run else None
+    if not dataset_id:
+        _log(f"Apify run returned no dataset for {list(search_inputs)}")
+        return per_query, None
+
+    try:
+        async for item in client.dataset(dataset_id).iterate_items():
+            counts = _item_counts(item, search_inputs, per_query)
+            if counts is not None:
+                _count_item_hashtags(item, counts, match)
+    except Exception as exc:
+        _log(f"Failed to read Apify dataset for {list(search_inputs)}: {exc}")
+        return per_query, None
+
+    return per_query, time.perf_counter() - b_start
+
+async def _worker(index, queue, results, client, match, limit):
+    """Pull batches off `queue` until cancelled; idle while `index` is above the target."""
+    while True:
+        # Workers beyond the current target sit out until it is raised again;
+        # worker 0 always runs, so the queue is guaranteed to drain.
+        while index >= limit.desired:
+            await asyncio.sleep(APIFY_CALL_BACKOFF_SECONDS)
+        batch = await queue.get()
+        try:
+            per_query, b_duration = await _process_batch_async(batch, client, match, limit)
+            if b_duration is not None:
+                limit.on_success()
+            await results.put((per_query, b_duration))
+        finally:
+            queue.task_done()
+
+async def get_trending_hashtags_for_list_async(hashtags, num_results=1, concurrency=APIFY_ASYNC_CONCURRENCY, vocabulary=None,
+                                               use_cache=True):
+    """
+    Asyncio variant of `get_trending_hashtags_for_list` built on `ApifyClientAsync`.
+
+    Query batches are pulled off an asyncio.Queue by a pool of `concurrency`
+    workers. The number of active workers shrinks on Apify rate-limit errors
+    and grows back after a run of successes. Use `asyncio.run(...)` to call it
+    from sync code.
+
+    Returns:
+      List[str] - unique hashtags found, most frequent first (e.g., '#AI', '#MachineLearning')
+    """
+    api_key = os.getenv("APIFY_API_TOKEN")
+    if not api_key:
+        raise ValueError("APIFY_API_TOKEN not set in environment variables.")
+
+    normalized = _normalize_inputs(hashtags)
+    total_queries = len(normalized)
+    if total_queries == 0:
+        return []
+
+    client = ApifyClientAsync(api_key)
+    match = _build_vocab_matcher(vocabulary) if vocabulary is not None else _HASHTAG_RE.findall
+
+    if _VERBOSE:
+        print(f"\nStarting hashtag search at {datetime.now().strftime('%H:%M:%S')}")
+    print(f"Total queries to process: {total_queries}\n")
+
+    start_time = time.perf_counter()
+    trending = Counter()
+    cached, pending = _cached_counts(normalized, vocabulary, use_cache)
+    for counts in cached.values():
+        trending.update(counts)
+
+    queue = asyncio.Queue()
+    for batch in _batches(pending):
+        queue.put_nowait(batch)
+    results = asyncio.Queue()
+    if queue.qsize():
+        limit = _AdaptiveConcurrency(min(concurrency, queue.qsize()))
+        workers = [
+            asyncio.create_task(_worker(i, queue, results, client, match, limit))
+            for i in range(limit.maximum)
+        ]
+        try:
+            await queue.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    while not results.empty():
+        per_query, b_duration = results.get_nowait()
+        for counts in per_query.values():
+            trending.update(counts)
+        if b_duration is None:
             continue
+        _store_counts(per_query, vocabulary)
+        if _VERBOSE:
+            print(f"Batch finished in {b_duration:.2f}s")
 
-        # Extract hashtags from organicResults, relatedQueries, snippets etc.
-        for item in dataset_items:
-            # Organic results
-            organic = item.get("organicResults") or []
-            for result in organic:
-                # Title & snippet & description and other text fields
-                for field in ("title", "snippet", "description", "plainText", "text"):
-                    val = result.get(field) if isinstance(result, dict) else None
-                    if isinstance(val, str):
-                        for m in hashtag_pattern.findall(val):
-                            trending.add(m)
-                # Sometimes result fields themselves can be dicts (rare); attempt safe access
-                # (we intentionally don't crash if structure is unexpected)
-
-            # Related queries (could be strings or dicts)
-            related = item.get("relatedQueries") or []
-            for r in related:
-                # r may be string or dict with 'text' or 'query'
-                if isinstance(r, str):
-                    text_to_check = r
-                elif isinstance(r, dict):
-                    text_to_check = r.get("text") or r.get("query") or r.get("title") or ""
-                else:
-                    text_to_check = str(r)
-                if isinstance(text_to_check, str):
-                    for m in hashtag_pattern.findall(text_to_check):
-                        trending.add(m)
-
-            # Some actors provide aiMode/aiOverview fields; scan them safely
-            for ai_field in ("aiOverview", "aiModeResults", "aiOverviews"):
-                ai_val = item.get(ai_field)
-                if isinstance(ai_val, str):
-                    for m in hashtag_pattern.findall(ai_val):
-                        trending.add(m)
-                elif isinstance(ai_val, list):
-                    for sub in ai_val:
-                        if isinstance(sub, str):
-                            for m in hashtag_pattern.findall(sub):
-                                trending.add(m)
-
-        q_duration = time.time() - q_start
-        print(f"Processed '{search_phrase}' ({processed}/{total_queries}) in {q_duration:.2f}s")
-
-    total_duration = time.time() - start_time
-    avg = total_duration / total_queries if total_queries else 0.0
+    total_duration = time.perf_counter() - start_time
     print(f"\nFinished processing all queries in {total_duration:.2f} seconds")
-    print(f"Average time per query: {avg:.2f} seconds")
     print(f"Total unique hashtags found: {len(trending)}\n")
 
-    return list(trending)
\ No newline at end of file
+    return [tag for tag, _ in trending.most_common()]
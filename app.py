@@ -1,16 +1,27 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 import json
+import queue
+import re
+import threading
 from datetime import datetime
 
 # Import your hashtag generation modules
 from scraper import scrape_url
-from keyword_extractor import extract_keywords
-from hashtag_generator import generate_hashtags
-from apify_trending_for_hashtags import get_trending_hashtags_for_list
-import google.generativeai as genai
+from combined_llm import generate_and_validate_hashtags, run_pipeline
+from hashtag_generator import select_top_hashtags
+from utils import content_digest, dedupe_key
+from tools.cache import FileCache
+from tools.dedupe_filter import normalize_item
+from apify_trending_for_hashtags import get_trending_hashtags_for_list, get_shared_client
+
+# Optional fast JSON codec (falls back to stdlib json)
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 # Optional fallback scraper
 try:
@@ -25,59 +36,99 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
 # Create logs directory if it doesn't exist
 LOGS_DIR = "logs"
 if not os.path.exists(LOGS_DIR):
     os.makedirs(LOGS_DIR)
 
-def normalize_item(item):
-    """Convert dict-like items to readable string"""
-    if isinstance(item, str):
-        return item.strip()
-    if isinstance(item, dict):
-        for key in ("title", "text", "query", "q", "searchQuery"):
-            if key in item and isinstance(item[key], str) and item[key].strip():
-                return item[key].strip()
-        if "url" in item and isinstance(item["url"], str):
-            try:
-                from urllib.parse import urlparse, parse_qs
-                p = urlparse(item["url"])
-                qs = parse_qs(p.query)
-                if "q" in qs and qs["q"]:
-                    return qs["q"][0]
-            except Exception:
-                pass
-        return str(item)
-    return str(item)
-
-def select_top_hashtags(trending_hashtags, keywords, content):
-    """Use Gemini LLM to select top 20 most relevant hashtags"""
-    prompt = (
-        "You are an expert SEO auditor and social media strategist.\n"
-        "Given the following list of trending hashtags, keywords, and company page content, "
-        "select the 20 most relevant, currently trending hashtags for a company SEO audit report.\n"
-        "All hashtags must meet company standards: professional, SEO-friendly, and suitable for enterprise use.\n"
-        "Avoid generic, unrelated, or overused hashtags.\n"
-        "Return only the hashtags, separated by commas, no extra text.\n\n"
-        f"Trending Hashtags:\n{', '.join(trending_hashtags)}\n\n"
-        f"Keywords:\n{', '.join(keywords)}\n\n"
-        f"Page Content:\n{content}\n"
-    )
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(prompt, generation_config={"temperature": 0})
-        hashtags_llm = [
-            tag.strip().replace(' ', '') if tag.strip().startswith('#') 
-            else '#' + tag.strip().replace(' ', '') 
-            for tag in response.text.split(",") if tag.strip()
-        ]
-        return hashtags_llm[:20]
-    except Exception as e:
-        print(f"Gemini LLM hashtag selection error: {e}")
-        return trending_hashtags[:20]
+# End-to-end result cache keyed on (url, scraped content digest); kept in a
+# subdirectory so /history doesn't list it as a run
+RESULT_CACHE_TTL = 24 * 3600
+RESULT_CACHE_DIR = os.path.join(LOGS_DIR, "cache")
+os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+result_cache = FileCache(os.path.join(RESULT_CACHE_DIR, "results.sqlite"), default_ttl=RESULT_CACHE_TTL)
+
+# Run logs are written by a background thread so the response doesn't wait on disk
+_log_q = queue.Queue()
+
+def _log_worker():
+    while True:
+        filename, payload = _log_q.get()
+        try:
+            with open(filename, 'wb') as f:
+                f.write(payload)
+        except Exception as e:
+            print(f"[ERROR] Failed to write log {filename}: {e}")
+        finally:
+            _log_q.task_done()
+
+threading.Thread(target=_log_worker, name="log-writer", daemon=True).start()
+
+def _encode_log(result):
+    if orjson is not None:
+        return orjson.dumps(result, option=orjson.OPT_INDENT_2)
+    return json.dumps(result, indent=4, ensure_ascii=False).encode('utf-8')
+
+# Scraped content is trimmed to this many characters before the Gemini prompts
+TRIM_MAX_CHARS = 8000
+_PARA_SPLIT_RE = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+# /history paging and summary extraction
+HISTORY_DEFAULT_LIMIT = 50
+SUMMARY_READ_BYTES = 4096
+_LOG_URL_RE = re.compile(rb'"url"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _ok(obj, status=200):
+    """JSON response encoded with orjson (stdlib json if orjson isn't installed)."""
+    body = orjson.dumps(obj) if orjson is not None else json.dumps(obj)
+    return Response(body, status=status, headers=_JSON_HEADERS)
+
+def _trim_content(content, keywords=None, max_chars=TRIM_MAX_CHARS):
+    """
+    Bound `content` to about `max_chars` for the Gemini prompts.
+    Keeps the longest distinct paragraphs, preferring ones that mention a keyword,
+    and returns them in page order. Paragraphs are split on blank lines; oversized
+    ones (e.g. the primary scraper's single run of text) are split into sentences.
+    """
+    if len(content) <= max_chars:
+        return content
+
+    # Repeated blocks (nav, cookie banners, footers) are kept only once
+    chunks = []
+    seen = set()
+    for para in _PARA_SPLIT_RE.split(content):
+        para = para.strip()
+        if not para:
+            continue
+        pieces = _SENTENCE_SPLIT_RE.split(para) if len(para) > max_chars else (para,)
+        for piece in pieces:
+            if not piece:
+                continue
+            key = dedupe_key(piece)
+            if key not in seen:
+                seen.add(key)
+                chunks.append(piece)
+
+    needles = [k.lower() for k in (keywords or []) if k]
+    def _rank(i):
+        low = chunks[i].lower()
+        return (not any(n in low for n in needles), -len(chunks[i]))
+
+    chosen = []
+    used = 0
+    for i in sorted(range(len(chunks)), key=_rank):
+        size = len(chunks[i]) + 2
+        if used + size > max_chars:
+            continue
+        chosen.append(i)
+        used += size
+
+    if not chosen:
+        return content[:max_chars]
+    return "\n\n".join(chunks[i] for i in sorted(chosen))
 
 @app.route('/')
 def index():
@@ -91,10 +142,12 @@ def generate_hashtags_api():
         data = request.get_json()
         url = data.get('url', '').strip()
         provided_keywords = data.get('provided_keywords')
+        # ?nocache=1 forces a full recompute
+        use_cache = request.args.get('nocache') != '1'
 
         # Validate URL
         if not url:
-            return jsonify({"error": "URL is required"}), 400
+            return _ok({"error": "URL is required"}, 400)
 
         print(f"\n[INFO] Processing URL: {url}")
 
@@ -109,22 +162,38 @@ def generate_hashtags_api():
                     print(f"[ERROR] Fallback scraper exception: {e}")
             
             if not content.strip():
-                return jsonify({
+                return _ok({
                     "error": "No content could be scraped from the URL by either scraper. Please check the site or try another URL."
-                }), 400
+                }, 400)
 
-        # Step 2: Get keywords
+        # Serve a previous result for the same page content if we have one.
+        # Keyed on the content digest so the entry goes stale when the page changes.
         if provided_keywords:
+            provided_keywords = [normalize_item(k) for k in provided_keywords]
+        # Bound prompt size (and input-token spend) for long pages
+        content = _trim_content(content, provided_keywords)
+        cache_key = f"{url}::{content_digest(content)}::{','.join(provided_keywords or [])}"
+        if use_cache:
+            cached_result = result_cache.get(cache_key)
+            if cached_result is not None:
+                print(f"[INFO] Cache hit for {url}")
+                return _ok(cached_result)
+
+        apify_key = os.getenv("APIFY_API_TOKEN")
+        trending_hashtags = None
+        if provided_keywords and apify_key:
+            # Keywords are known up front: run Apify alongside Gemini hashtag generation
             keywords = provided_keywords
+            hashtags_gemini, trending_hashtags = generate_and_validate_hashtags(
+                keywords, content, get_shared_client(apify_key), use_cache=use_cache
+            )
         else:
-            keywords = extract_keywords(content)
-
-        # Normalize keywords
-        keywords = [normalize_item(k) for k in keywords]
+            # Steps 2-3: Get keywords and generate hashtags (one Gemini request)
+            keywords, hashtags_gemini = run_pipeline(content, provided_keywords, use_cache=use_cache)
 
-        # Step 3: Generate hashtags using Gemini LLM
-        hashtags_gemini = generate_hashtags((keywords, content))
-        hashtags_gemini = [normalize_item(h) for h in hashtags_gemini]
+        # Pipeline output is already stripped strings; only coerce anything else
+        keywords = [k if type(k) is str else normalize_item(k) for k in keywords]
+        hashtags_gemini = [h if type(h) is str else normalize_item(h) for h in hashtags_gemini]
 
         print('\n=== Pipeline inputs ===')
         print('Extracted keywords:')
@@ -135,23 +204,28 @@ def generate_hashtags_api():
             print(f"  {i}. {h}")
 
         # Step 4: Use Apify to validate only the Gemini-generated hashtags
-        apify_key = os.getenv("APIFY_API_TOKEN")
-        trending_hashtags = []
-        if apify_key:
-            # Only use Gemini hashtags for Apify validation
-            query_list = [h.strip() for h in hashtags_gemini if isinstance(h, str) and h.strip()]
+        if trending_hashtags is not None:
+            pass  # already validated alongside hashtag generation
+        elif apify_key:
+            # Only use Gemini hashtags for Apify validation (deduped, order kept)
+            cleaned = (h.strip() for h in hashtags_gemini if isinstance(h, str) and h.strip())
+            query_list = list(dict.fromkeys(cleaned))
             
             print('\nSending Gemini hashtags to Apify for validation:')
             for i, q in enumerate(query_list, 1):
                 print(f"  {i}. {q}")
 
-            trending_hashtags = get_trending_hashtags_for_list(query_list)
+            # Shared client keeps its connection pool warm across requests
+            trending_hashtags = get_trending_hashtags_for_list(
+                query_list, client=get_shared_client(apify_key), use_cache=use_cache
+            ) if query_list else []
         else:
+            trending_hashtags = []
             print("[WARNING] APIFY_API_TOKEN not found. Skipping trending hashtags fetch.")
 
         # Step 5: Use Gemini to select top 20 hashtags
         if trending_hashtags:
-            trending_hashtags = select_top_hashtags(trending_hashtags, keywords, content)
+            trending_hashtags = select_top_hashtags(trending_hashtags, keywords, content, use_cache=use_cache)
         else:
             print("[WARNING] No trending hashtags found from Apify.")
 
@@ -165,39 +239,63 @@ def generate_hashtags_api():
 
         # Step 7: Save to logs
         log_filename = os.path.join(LOGS_DIR, f"hashtag_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        with open(log_filename, 'w') as f:
-            json.dump(result, f, indent=4, ensure_ascii=False)
-        print(f"\n[INFO] Results saved to {log_filename}")
+        _log_q.put((log_filename, _encode_log(result)))
+        print(f"\n[INFO] Results queued for {log_filename}")
+
+        if trending_hashtags:
+            result_cache.set(cache_key, result)
 
-        return jsonify(result), 200
+        return _ok(result)
 
     except Exception as e:
         print(f"[ERROR] {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        return _ok({"error": str(e)}, 500)
 
 @app.route('/api/auth/logout', methods=['POST'])
 def logout():
     """Handle logout (redirect to login page)"""
-    return jsonify({"message": "Logged out successfully"}), 200
+    return _ok({"message": "Logged out successfully"})
 
 @app.route('/history', methods=['GET'])
 def history():
-    """Get list of all previous runs"""
+    """
+    List previous runs, newest first, as filename + mtime.
+    Use /api/logs/<filename> for the full contents. Query params:
+    ?limit=N (default 50) and ?include=summary to add each run's url.
+    """
     try:
-        logs = []
+        limit = max(request.args.get('limit', HISTORY_DEFAULT_LIMIT, type=int), 0)
+        include_summary = request.args.get('include') == 'summary'
+        entries = []
         if os.path.exists(LOGS_DIR):
-            for filename in sorted(os.listdir(LOGS_DIR), reverse=True):
-                if filename.endswith('.json'):
-                    filepath = os.path.join(LOGS_DIR, filename)
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                        logs.append({
-                            "filename": filename,
-                            "data": data
-                        })
-        return jsonify({"logs": logs}), 200
+            with os.scandir(LOGS_DIR) as it:
+                entries = [(e.stat().st_mtime, e) for e in it if e.is_file() and e.name.endswith('.json')]
+        entries.sort(key=lambda pair: pair[0], reverse=True)
+
+        logs = []
+        for mtime, entry in entries[:limit]:
+            log = {"filename": entry.name, "mtime": mtime}
+            if include_summary:
+                log["url"] = _read_log_url(entry.path)
+            logs.append(log)
+        return _ok({"logs": logs})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _ok({"error": str(e)}, 500)
+
+def _read_log_url(path):
+    """Pull the "url" field out of the head of a log file without parsing all of it."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SUMMARY_READ_BYTES)
+    except OSError:
+        return None
+    m = _LOG_URL_RE.search(head)
+    if not m:
+        return None
+    try:
+        return json.loads(b'"' + m.group(1) + b'"')
+    except ValueError:
+        return None
 
 @app.route('/api/logs/<filename>', methods=['GET'])
 def get_log(filename):
@@ -205,21 +303,25 @@ def get_log(filename):
     try:
         filepath = os.path.join(LOGS_DIR, filename)
         if not os.path.exists(filepath):
-            return jsonify({"error": "Log not found"}), 404
+            return _ok({"error": "Log not found"}, 404)
         
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-        return jsonify(data), 200
+        if orjson is not None:
+            with open(filepath, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(filepath, 'r') as f:
+                data = json.load(f)
+        return _ok(data)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _ok({"error": str(e)}, 500)
 
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({"error": "Endpoint not found"}), 404
+    return _ok({"error": "Endpoint not found"}, 404)
 
 @app.errorhandler(500)
 def internal_error(error):
-    return jsonify({"error": "Internal server error"}), 500
+    return _ok({"error": "Internal server error"}, 500)
 
 if __name__ == '__main__':
     print("[INFO] Starting Hashtag Generator Flask App...")
@@ -0,0 +1,156 @@
+"""combined_llm.py
+
+Single-request Gemini pipeline for the web endpoint.
+
+Keyword extraction and hashtag generation used to be two sequential Gemini
+round-trips. `run_pipeline` asks for both in one `generate_content` call that
+returns strict JSON, then applies the same hashtag cleaning/grounding checks as
+`hashtag_generator.generate_hashtags`.
+
+If the fused call fails or returns unusable JSON, it falls back to the original
+two-step path so callers always get a result.
+
+`generate_and_validate_hashtags` is the provided-keywords path shared by the web
+endpoint and the CLI: Gemini hashtag generation overlapped with Apify validation.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from config import GEMINI_MAX_OUTPUT_TOKENS
+from gemini_cache import get_cached_model, get_model
+from keyword_extractor import KEYWORD_FEW_SHOTS, extract_keywords
+from hashtag_generator import finalize_hashtags, generate_hashtags, keyword_hashtags
+from apify_trending_for_hashtags import get_trending_hashtags_for_list
+from tools.dedupe_filter import normalize_item
+from utils import content_digest
+
+# Load environment variables from .env file
+load_dotenv()
+
+# In-process LRU of pipeline results keyed on (content digest, provided keywords);
+# Gemini runs at temperature 0, so identical inputs give identical outputs
+PIPELINE_CACHE_SIZE = 512
+_pipeline_cache = OrderedDict()
+_pipeline_cache_lock = threading.Lock()
+
+# Structured output contract for the fused call
+_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "keywords": {"type": "array", "items": {"type": "string"}},
+        "hashtags": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["keywords", "hashtags"],
+}
+
+
+# Static part of the fused prompt; only the page content tail varies per request
+_PREAMBLE = """
+You are an expert SEO auditor and social media strategist working to meet company standards for digital marketing and SEO audits.
+Complete both tasks below for the provided company Page Content and answer with a single JSON object.
+
+Task 1 - "keywords": extract the most important, high-value, and SEO-relevant keywords.
+- Only extract keywords and key phrases that are highly relevant to the main topic and business context.
+- Avoid generic, filler, or overly broad terms (e.g., 'data', 'business', 'company').
+- Include both single-word and multi-word phrases that are suitable for hashtags, search optimization, and professional reporting.
+- Rank keywords by importance and specificity to the content.
+- Return 15-20 keywords or key phrases.
+
+Keyword few-shot examples (comma-separated here, but return a JSON array):
+""" + KEYWORD_FEW_SHOTS + """
+Task 2 - "hashtags": produce up to 20 hashtags that are directly derived from your keywords and the Page Content.
+- DO NOT invent unrelated industry terms or generic marketing buzzwords that are not grounded in the input.
+- Use exact keyword words or short, safe variants of those words (e.g., remove spaces, use CamelCase) and prefer tokens that appear in the Page Content.
+- Use at most one or two short variations per keyword (e.g., "#Keyword", "#KeywordTips").
+- Do not include slang, emojis, or unrelated trending topics.
+
+"""
+
+
+def run_pipeline(content, provided_keywords=None, use_cache=True):
+    """
+    Return `(keywords, hashtags)` for `content` using a single Gemini request.
+
+    When `provided_keywords` is given only hashtag generation is needed, which is
+    already a single request, so this defers to `generate_hashtags`.
+    Results are memoized per content digest unless `use_cache` is False.
+    """
+    key = (content_digest(content), tuple(provided_keywords) if provided_keywords else None)
+    if use_cache:
+        with _pipeline_cache_lock:
+            hit = _pipeline_cache.get(key)
+            if hit is not None:
+                _pipeline_cache.move_to_end(key)
+                return list(hit[0]), list(hit[1])
+
+    keywords, hashtags = _run_pipeline(content, provided_keywords, use_cache)
+    if not (keywords and hashtags):
+        # Don't pin an empty result from a failed Gemini call
+        return keywords, hashtags
+
+    with _pipeline_cache_lock:
+        _pipeline_cache[key] = (tuple(keywords), tuple(hashtags))
+        _pipeline_cache.move_to_end(key)
+        while len(_pipeline_cache) > PIPELINE_CACHE_SIZE:
+            _pipeline_cache.popitem(last=False)
+    return keywords, hashtags
+
+
+def _run_pipeline(content, provided_keywords, use_cache=True):
+    if provided_keywords:
+        return provided_keywords, generate_hashtags((provided_keywords, content))
+
+    try:
+        generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": _RESPONSE_SCHEMA,
+            "temperature": 0,
+            "max_output_tokens": GEMINI_MAX_OUTPUT_TOKENS,
+        }
+        tail = f"Page Content:\n{content}\n"
+        cached = get_cached_model("combined-pipeline", _PREAMBLE)
+        if cached is not None:
+            response = cached.generate_content(tail, generation_config=generation_config)
+        else:
+            response = get_model().generate_content(_PREAMBLE + tail, generation_config=generation_config)
+        data = json.loads(response.text)
+        keywords = [kw.strip() for kw in data.get("keywords", []) if isinstance(kw, str) and kw.strip()]
+        raw_tags = [t for t in data.get("hashtags", []) if isinstance(t, str)]
+        if not keywords:
+            raise ValueError("no keywords in response")
+        return keywords, finalize_hashtags(raw_tags, keywords)
+    except Exception as e:
+        print(f"Gemini combined pipeline error: {e} — falling back to separate calls")
+        keywords = extract_keywords(content, use_cache=use_cache)
+        return keywords, generate_hashtags((keywords, content))
+
+
+def generate_and_validate_hashtags(keywords, content, client, use_cache=True):
+    """
+    Generate Gemini hashtags for already-known `keywords` while Apify validates
+    the hashtags derived directly from those keywords, so the two slowest network
+    waits overlap. Once Gemini answers, only its tags that the first Apify pass
+    didn't cover are queried. Returns (hashtags_gemini, trending_hashtags).
+    """
+    speculative = keyword_hashtags(keywords)
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        fut_apify = ex.submit(get_trending_hashtags_for_list, speculative, client=client, use_cache=use_cache)
+        fut_llm = ex.submit(run_pipeline, content, keywords, use_cache=use_cache)
+
+        _, hashtags_gemini = fut_llm.result()
+        hashtags_gemini = [h if type(h) is str else normalize_item(h) for h in hashtags_gemini]
+        covered = set(speculative)
+        cleaned = (h.strip() for h in hashtags_gemini if isinstance(h, str) and h.strip())
+        remaining = [h for h in dict.fromkeys(cleaned) if h not in covered]
+
+        print('\nSending Gemini hashtags to Apify for validation:')
+        for i, q in enumerate(remaining, 1):
+            print(f"  {i}. {q}")
+        extra = get_trending_hashtags_for_list(remaining, client=client, use_cache=use_cache) if remaining else []
+        trending = list(dict.fromkeys(fut_apify.result() + extra))
+    return hashtags_gemini, trending
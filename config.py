@@ -3,3 +3,7 @@ from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
+
+# Upper bound on Gemini output (thinking + answer) per request; keeps latency
+# bounded on long pages. Keyword/hashtag answers are a few hundred tokens.
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "4096"))
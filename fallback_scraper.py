@@ -3,23 +3,50 @@
 Robust fallback scraper. Use this when the main `scraper.py` returns empty or HTTP 403/401.
 
 Behavior:
-- Try multiple common browser User-Agent headers via requests.Session
+- Try multiple common browser User-Agent headers, one after another over a pooled keep-alive
+  httpx client; `scrape_url_fallback_async` sends them concurrently over HTTP/2 instead
 - If requests keep failing with 403/401, try the Jina text proxy (https://r.jina.ai/http://<url>)
 - If still failing and selenium is available, attempt a headless browser render (requires chromedriver/geckodriver)
-- Extracts readable text using BeautifulSoup, preferring <article>, long <div>, and <p> content
+- Extracts readable text in a single DOM walk (selectolax when installed, else BeautifulSoup),
+  preferring <article>, long <div>, and <p> content
 
 This file intentionally does not modify `scraper.py`.
 """
 
+import asyncio
+import random
 import time
-import re
-import urllib3
 from typing import Optional
 
-import requests
+import httpx
 from bs4 import BeautifulSoup
 
-urllib3.disable_warnings()
+# optional C-backed HTML parser (non-fatal if missing; falls back to BeautifulSoup).
+# Lexbor backend: selectolax.parser (Modest) is deprecated and gone in selectolax 1.0
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except Exception:
+    HTMLParser = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    _HTTP2 = True
+except Exception:
+    _HTTP2 = False
+
+# Shared pooled client for the blocking path: retries and repeat scrapes of the
+# same host reuse the TCP/TLS connection instead of handshaking again.
+# httpx.Client is thread-safe, so Flask worker threads can share it
+_CLIENT = httpx.Client(
+    http2=_HTTP2,
+    verify=False,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+)
+
+_BLOCK_TAGS = frozenset(("div", "main", "section"))
+_ARTICLE_TAGS = frozenset(("p", "h1", "h2", "h3"))
+_NOISE_TAGS = frozenset(("script", "style", "noscript", "iframe", "header", "footer", "svg"))
 
 DEFAULT_HEADERS = [
     # Chrome on Windows
@@ -40,39 +67,108 @@ DEFAULT_HEADERS = [
 ]
 
 
-def extract_text_from_html(html: str) -> str:
-    """Extract readable textual content from HTML. Returns a cleaned string."""
-    soup = BeautifulSoup(html, "html.parser")
+def _scan_dom(root, children):
+    """
+    Walk the tree under `root` once and collect, in document order:
+      - noise elements (script, style, header, footer, ...) to remove; not descended into
+      - p/h1/h2/h3 elements inside the first <article>
+      - outermost div/main/section elements (no such ancestor)
+      - all <p> elements
+    `children(node)` returns `(tag_name, child)` pairs.
 
-    # Remove scripts, styles, noscript
-    for tag in soup(["script", "style", "noscript", "iframe", "header", "footer", "svg"]):
-        tag.decompose()
+    A container's text includes all of its descendants' text, so the largest block
+    is always an outermost one; nested containers never need to be measured.
+    """
+    noise, article_parts, blocks, paragraphs = [], [], [], []
+    seen_article = False
+    stack = [(name, node, False, False) for name, node in reversed(children(root))]
+    while stack:
+        name, node, in_article, in_block = stack.pop()
+        if name in _NOISE_TAGS:
+            noise.append(node)
+            continue
+        if name == "article" and not seen_article:
+            seen_article = in_article = True
+        if in_article and name in _ARTICLE_TAGS:
+            article_parts.append(node)
+        if name == "p":
+            paragraphs.append(node)
+        if name in _BLOCK_TAGS and not in_block:
+            blocks.append(node)
+            in_block = True
+        stack.extend((n, c, in_article, in_block) for n, c in reversed(children(node)))
+    return noise, article_parts, blocks, paragraphs
 
+
+def _select_text(article_parts, blocks, paragraphs, text_of):
+    """Apply the article > largest block > paragraphs preference; "" if none applies."""
     # Prefer <article>
-    article = soup.find("article")
-    if article:
-        texts = [p.get_text(separator=" ", strip=True) for p in article.find_all(["p", "h1", "h2", "h3"]) if p.get_text(strip=True)]
-        if texts:
-            return "\n\n".join(texts)
+    texts = [t for t in map(text_of, article_parts) if t]
+    if texts:
+        return "\n\n".join(texts)
 
     # Otherwise, find the largest div by text length
-    candidates = soup.find_all(["div", "main", "section"])
     best = None
     best_len = 0
-    for c in candidates:
-        text = c.get_text(separator=" ", strip=True)
+    for c in blocks:
+        text = text_of(c)
         ln = len(text)
         if ln > best_len:
             best_len = ln
             best = text
 
     if best and best_len > 200:
-        return re.sub(r"\s+", " ", best).strip()
+        return " ".join(best.split())
 
     # Fallback: join paragraphs
-    paragraphs = [p.get_text(separator=" ", strip=True) for p in soup.find_all("p") if p.get_text(strip=True)]
+    paragraphs = [t for t in map(text_of, paragraphs) if t]
     if paragraphs:
         return "\n\n".join(paragraphs)
+    return ""
+
+
+def extract_text_from_html(html: str) -> str:
+    """Extract readable textual content from HTML. Returns a cleaned string."""
+    if HTMLParser is not None:
+        return _extract_text_selectolax(html)
+    return _extract_text_bs4(html)
+
+
+def _extract_text_selectolax(html: str) -> str:
+    """selectolax implementation of `extract_text_from_html` (same strategy, parsed in C)."""
+    tree = HTMLParser(html)
+    if tree.root is None:
+        return ""
+
+    noise, article_parts, blocks, paragraphs = _scan_dom(tree.root, lambda n: [(c.tag, c) for c in n.iter()])
+    for node in noise:
+        node.decompose()
+
+    text = _select_text(article_parts, blocks, paragraphs, lambda n: n.text(separator=" ", strip=True))
+    if text:
+        return text
+
+    # Last resort: meta description or title
+    meta = tree.css_first('meta[name="description"]') or tree.css_first('meta[property="og:description"]')
+    desc = (meta.attributes.get("content") or "").strip() if meta is not None else ""
+    if desc:
+        return desc
+    title = tree.css_first("title")
+    title_text = title.text(strip=True) if title is not None else ""
+    return title_text
+
+
+def _extract_text_bs4(html: str) -> str:
+    """BeautifulSoup implementation of `extract_text_from_html`."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    noise, article_parts, blocks, paragraphs = _scan_dom(soup, lambda n: [(c.name, c) for c in n.children if c.name])
+    for tag in noise:
+        tag.decompose()
+
+    text = _select_text(article_parts, blocks, paragraphs, lambda n: n.get_text(separator=" ", strip=True))
+    if text:
+        return text
 
     # Last resort: meta description or title
     desc = None
@@ -87,40 +183,133 @@ def extract_text_from_html(html: str) -> str:
     return ""
 
 
+def _jina_proxy_url(url: str) -> str:
+    # removeprefix, not lstrip: lstrip strips a character set and would eat e.g. the "t" of "techcrunch.com"
+    bare = url.removeprefix("https://").removeprefix("http://")
+    return f"https://r.jina.ai/http://{bare}"
+
+
+def _scrape_with_selenium(url: str, timeout: int) -> str:
+    """Render `url` in headless Chrome and extract its text. Returns "" on any failure."""
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+
+        options = Options()
+        options.add_argument("--headless=new")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1920,1080")
+        # Prevent some sites from blocking by adding UA
+        options.add_argument(f"--user-agent={DEFAULT_HEADERS[0]['User-Agent']}")
+
+        driver = webdriver.Chrome(options=options)
+        try:
+            driver.set_page_load_timeout(timeout)
+            driver.get(url)
+            time.sleep(2)
+            html = driver.page_source
+            text = extract_text_from_html(html)
+            if text and len(text) > 50:
+                return text
+        finally:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+    except Exception:
+        # Selenium not installed or driver not present; just ignore
+        pass
+    return ""
+
+
+async def _fetch_html_async(client, url: str, headers: dict) -> str:
+    """GET `url` with one header set; return extracted text, or "" if unusable."""
+    try:
+        resp = await client.get(url, headers=headers)
+    except Exception:
+        return ""
+    if resp.status_code == 200 and "text/html" in (resp.headers.get("Content-Type") or ""):
+        text = extract_text_from_html(resp.text)
+        if text and len(text) > 50:
+            return text
+    return ""
+
+
+async def scrape_url_fallback_async(url: str, max_attempts: int = 3, timeout: int = 15, use_selenium_if_needed: bool = True) -> str:
+    """Async version of `scrape_url_fallback`.
+
+    All User-Agent attempts are sent at once (multiplexed over HTTP/2 when h2 is
+    installed) and the first usable page wins; the rest are cancelled.
+    """
+    url = url.strip()
+    if not url.startswith("http"):
+        url = "http://" + url
+
+    # One client per call: httpx async clients are tied to the event loop they run on
+    async with httpx.AsyncClient(http2=_HTTP2, verify=False, timeout=timeout, follow_redirects=True) as client:
+        # 1) Try all rotating headers concurrently; first usable response wins
+        headers_list = [DEFAULT_HEADERS[i % len(DEFAULT_HEADERS)] for i in range(max_attempts)]
+        tasks = [asyncio.ensure_future(_fetch_html_async(client, url, h)) for h in headers_list]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                text = await fut
+                if text:
+                    return text
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        # 2) Try Jina text proxy over the same client
+        try:
+            resp = await client.get(_jina_proxy_url(url))
+            if resp.status_code == 200 and resp.text and len(resp.text.strip()) > 50:
+                return resp.text.strip()
+        except Exception:
+            pass
+
+    # 3) Selenium last resort (blocking, so run it off the event loop)
+    if use_selenium_if_needed:
+        return await asyncio.to_thread(_scrape_with_selenium, url, timeout)
+    return ""
+
+
 def scrape_url_fallback(url: str, max_attempts: int = 3, timeout: int = 15, use_selenium_if_needed: bool = True) -> str:
     """Try several strategies to fetch and return the page text for `url`.
 
     Returns cleaned text (possibly empty string if nothing could be extracted).
+    Requests go through the module-level pooled client, so connections survive
+    across attempts and across calls; async callers should use
+    `scrape_url_fallback_async` instead.
     """
-    session = requests.Session()
-
     # Normalize URL
     url = url.strip()
     if not url.startswith("http"):
         url = "http://" + url
 
-    # 1) Try rotating headers with requests
+    # 1) Try rotating headers
     for attempt in range(1, max_attempts + 1):
         headers = DEFAULT_HEADERS[(attempt - 1) % len(DEFAULT_HEADERS)]
         try:
-            resp = session.get(url, headers=headers, timeout=timeout, allow_redirects=True, verify=False)
-        except Exception as e:
+            resp = _CLIENT.get(url, headers=headers, timeout=timeout)
+        except Exception:
             resp = None
-            last_exc = e
-        else:
-            last_exc = None
 
         if resp is not None and resp.status_code == 200 and "text/html" in (resp.headers.get("Content-Type") or ""):
             text = extract_text_from_html(resp.text)
             if text and len(text) > 50:
                 return text
-        # If 403/401, try next header immediately
-        time.sleep(1)
+        # Back off (exponential + jitter) only after a transient failure (network error,
+        # 429, 5xx) and not after the last attempt; a 401/403 is answered by the next
+        # User-Agent, so that retry goes out straight away
+        if attempt < max_attempts and (resp is None or resp.status_code == 429 or resp.status_code >= 500):
+            time.sleep(0.25 * (2 ** (attempt - 1)) + random.random() * 0.1)
 
     # 2) Try Jina text proxy (works for many sites as a quick fallback)
     try:
-        proxy_url = f"https://r.jina.ai/http://{url.lstrip('http://').lstrip('https://')}"
-        resp = session.get(proxy_url, timeout=timeout, allow_redirects=True, verify=False)
+        resp = _CLIENT.get(_jina_proxy_url(url), timeout=timeout)
         if resp.status_code == 200 and resp.text:
             # Jina returns plain text already
             if len(resp.text.strip()) > 50:
@@ -130,36 +319,9 @@ def scrape_url_fallback(url: str, max_attempts: int = 3, timeout: int = 15, use_
 
     # 3) Optional: try Selenium headless rendering if installed and enabled
     if use_selenium_if_needed:
-        try:
-            from selenium import webdriver
-            from selenium.webdriver.chrome.options import Options
-
-            options = Options()
-            options.add_argument("--headless=new")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--window-size=1920,1080")
-            # Prevent some sites from blocking by adding UA
-            options.add_argument(f"--user-agent={DEFAULT_HEADERS[0]['User-Agent']}")
-
-            driver = webdriver.Chrome(options=options)
-            try:
-                driver.set_page_load_timeout(timeout)
-                driver.get(url)
-                time.sleep(2)
-                html = driver.page_source
-                text = extract_text_from_html(html)
-                if text and len(text) > 50:
-                    return text
-            finally:
-                try:
-                    driver.quit()
-                except Exception:
-                    pass
-        except Exception as e:
-            # Selenium not installed or driver not present; just ignore
-            pass
+        text = _scrape_with_selenium(url, timeout)
+        if text:
+            return text
 
     # If all else fails, return empty string
     return ""
@@ -0,0 +1,124 @@
+"""gemini_cache.py
+
+Optional Gemini explicit context caching for static prompt preambles.
+
+The keyword/hashtag prompts start with the same instructions and few-shot
+examples on every request. With caching enabled, that preamble is uploaded once
+as a `CachedContent` (TTL CACHE_TTL_SECONDS) and each request only sends its
+variable tail, so Google doesn't re-tokenize and re-prefill the preamble.
+
+Disabled unless GEMINI_CONTEXT_CACHE=1. Gemini refuses caches smaller than the
+model's minimum cacheable size, so a preamble that is too short is reported once
+and then served uncached. Callers must handle `get_cached_model` returning None.
+
+`get_model()` returns the one shared GenerativeModel for MODEL_NAME, configuring
+the SDK with GEMINI_API_KEY on first use; every module sends its uncached
+requests through it.
+
+Also holds the response cache (`get_response_cache()`), an on-disk cache of
+parsed Gemini answers keyed on the full prompt (`response_cache_key`). Calls run at temperature 0, so the same
+prompt gets the same answer; a hit skips the round trip entirely.
+"""
+
+import datetime
+import os
+import threading
+import time
+
+import google.generativeai as genai
+
+from tools.cache import FileCache
+from utils import content_digest
+# caching API is only present in newer SDK releases (non-fatal if missing)
+try:
+    from google.generativeai import caching
+except Exception:
+    caching = None
+
+MODEL_NAME = 'models/gemini-2.5-flash'
+CACHE_TTL_SECONDS = 3600
+# Re-create the cache this long before it expires
+CACHE_REFRESH_MARGIN_SECONDS = 300
+ENABLED = os.getenv("GEMINI_CONTEXT_CACHE", "0") == "1"
+
+# Parsed Gemini answers in a SQLite (WAL) FileCache; one lazily opened instance
+# per process, shared by every module through get_response_cache()
+RESPONSE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools', 'gemini_cache.sqlite')
+RESPONSE_CACHE_TTL = 7 * 86400
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+_models = {}
+_unavailable = set()
+_lock = threading.Lock()
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Shared GenerativeModel for MODEL_NAME; configures genai once, on first call."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+
+def _create(key, preamble):
+    """Upload `preamble` and bind a model to it, due for refresh shortly before expiry."""
+    get_model()  # make sure the SDK is configured
+    cache = caching.CachedContent.create(
+        model=MODEL_NAME,
+        display_name=key,
+        contents=[preamble],
+        ttl=datetime.timedelta(seconds=CACHE_TTL_SECONDS),
+    )
+    model = genai.GenerativeModel.from_cached_content(cached_content=cache)
+    _models[key] = (model, time.monotonic() + CACHE_TTL_SECONDS - CACHE_REFRESH_MARGIN_SECONDS)
+    return model
+
+
+def get_cached_model(key, preamble):
+    """
+    Return a GenerativeModel bound to a cached copy of `preamble`, or None when
+    caching is disabled or unavailable (send the full prompt in that case).
+
+    A cache close to expiry is re-created here, on the next request that needs
+    it, so an idle process doesn't keep paying for cache storage.
+    """
+    if not ENABLED or caching is None:
+        return None
+    with _lock:
+        if key in _unavailable:
+            return None
+        entry = _models.get(key)
+        if entry is not None:
+            model, refresh_at = entry
+            if time.monotonic() < refresh_at:
+                return model
+            del _models[key]
+        try:
+            return _create(key, preamble)
+        except Exception as e:
+            # e.g. preamble below the minimum cacheable size; don't retry per request
+            print(f"Gemini context cache unavailable for '{key}': {e}")
+            _unavailable.add(key)
+            return None
+
+
+def get_response_cache():
+    """The shared Gemini response FileCache, opened on first use."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = FileCache(RESPONSE_CACHE_PATH, default_ttl=RESPONSE_CACHE_TTL)
+    return _response_cache
+
+
+def response_cache_key(prompt):
+    """Response cache key for a full prompt sent to MODEL_NAME."""
+    return content_digest(f"{MODEL_NAME}::{prompt}")
@@ -1,24 +1,25 @@
-import google.generativeai as genai
-import os
+import re
 from dotenv import load_dotenv
+from config import GEMINI_MAX_OUTPUT_TOKENS
+from gemini_cache import get_model, get_response_cache, response_cache_key
 
-# Load environment variables from .env file and configure Gemini API
+# Load environment variables from .env file
 load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-def generate_hashtags(keywords):
-    """
-    Generate 20 professional, SEO-friendly hashtags using Gemini API, using both keywords and cleaned HTML content.
-    """
-    # Accept both keywords and content
-    if isinstance(keywords, tuple) and len(keywords) == 2:
-        keywords, content = keywords
-    else:
-        content = ""
-    # Stronger, constrained prompt that instructs the model to stay grounded in the provided
-    # keywords/content. We ask for comma-separated hashtags and emphasize not inventing
-    # unrelated or generic tags. We also request the model return only the hashtags.
-    prompt = f"""
+_GENERATION_CONFIG = {"temperature": 0, "max_output_tokens": GEMINI_MAX_OUTPUT_TOKENS}
+
+# Patterns used per hashtag/keyword; compiled once at import
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+_ALNUM_RE = re.compile(r"[^0-9A-Za-z]")
+_SPLIT_RE = re.compile(r"\s+|[-_]")
+_WORD_RE = re.compile(r"[A-Za-z0-9]{3,}")
+_WS_RE = re.compile(r"\s+")
+
+# Stronger, constrained prompt that instructs the model to stay grounded in the provided
+# keywords/content. We ask for comma-separated hashtags and emphasize not inventing
+# unrelated or generic tags. We also request the model return only the hashtags.
+# Both templates are built once; per-call values are filled in with format_map.
+_KEYWORDS_PROMPT = """
 You are an expert SEO auditor and social media strategist. Your only job is to produce
 hashtags that are directly derived from the provided Keywords and Page Content. DO NOT
 invent unrelated industry terms or generic marketing buzzwords that are not grounded in the
@@ -32,102 +33,210 @@ Requirements:
 - If you cannot find 20 grounded hashtags, return as many grounded hashtags as possible.
 
 Keywords:
-{', '.join(keywords)}
+{keywords}
 
 Page Content:
 {content}
 
 Output:
 """
-    def _clean_hashtag(raw):
-        s = raw.strip()
-        if not s:
-            return None
-        # remove surrounding quotes
-        s = s.strip("'\"")
-        # ensure leading '#'
-        if not s.startswith('#'):
-            s = '#' + s
-        # remove spaces and illegal chars, keep letters/numbers
-        import re
-        body = re.sub(r'[^0-9A-Za-z]', '', s.lstrip('#'))
-        if not body:
-            return None
-        # CamelCase the hashtag for readability
-        body = ''.join(part.capitalize() for part in re.split(r'\s+|[-_]', body))
-        return '#' + body
-
-    def _keywords_tokens(keywords_list):
-        toks = set()
-        import re
-        for k in keywords_list:
-            if not isinstance(k, str):
-                continue
-            for w in re.findall(r"[A-Za-z0-9]{3,}", k):
-                toks.add(w.lower())
-        return toks
 
+# Same rules, from the Page Content alone (keywords not known yet)
+_CONTENT_PROMPT = """
+You are an expert SEO auditor and social media strategist. Your only job is to produce
+hashtags that are directly derived from the provided Page Content. First identify the
+15-20 most important, high-value SEO keywords and key phrases in the content (do not output
+them), then derive hashtags from those keywords. DO NOT invent unrelated industry terms or
+generic marketing buzzwords that are not grounded in the input. Use exact keyword words or
+short, safe variants of those words (e.g., remove spaces, use CamelCase) and prefer tokens
+that appear in the Page Content.
+
+Requirements:
+- Return only hashtags, separated by commas, with NO extra commentary.
+- Use at most one or two short variations per keyword (e.g., "#Keyword", "#KeywordTips").
+- Do not include slang, emojis, or unrelated trending topics.
+- If you cannot find 20 grounded hashtags, return as many grounded hashtags as possible.
+
+Page Content:
+{content}
+
+Output:
+"""
+
+# Top-20 selection prompt, shared by the web app and the CLI
+_SELECT_PROMPT = (
+    "You are an expert SEO auditor and social media strategist.\n"
+    "Given the following list of trending hashtags, keywords, and company page content, "
+    "select the 20 most relevant, currently trending hashtags for a company SEO audit report.\n"
+    "All hashtags must meet company standards: professional, SEO-friendly, and suitable for enterprise use.\n"
+    "Avoid generic, unrelated, or overused hashtags.\n"
+    "Return only the hashtags, separated by commas, no extra text.\n\n"
+    "Trending Hashtags:\n{trending}\n\n"
+    "Keywords:\n{keywords}\n\n"
+    "Page Content:\n{content}\n"
+)
+
+def _clean_hashtag(raw):
+    s = raw.strip()
+    if not s:
+        return None
+    # remove surrounding quotes
+    s = s.strip("'\"")
+    # ensure leading '#'
+    if not s.startswith('#'):
+        s = '#' + s
+    # remove spaces and illegal chars, keep letters/numbers
+    body = _ALNUM_RE.sub('', s.lstrip('#'))
+    if not body:
+        return None
+    # CamelCase the hashtag for readability
+    body = ''.join(part.capitalize() for part in _SPLIT_RE.split(body))
+    return '#' + body
+
+def _keywords_tokens(keywords_list):
+    toks = set()
+    for k in keywords_list:
+        if not isinstance(k, str):
+            continue
+        for w in _WORD_RE.findall(k):
+            toks.add(w.lower())
+    return toks
+
+def keyword_hashtags(keywords, limit=20, variants=False):
+    """
+    Derive CamelCase hashtags directly from `keywords` without calling Gemini.
+    With `variants`, each keyword also gets a "#<Keyword>Tips" variant while space allows.
+    """
+    derived = []
+    for k in keywords:
+        if not isinstance(k, str):
+            continue
+        parts = _TOKEN_RE.findall(k)
+        if not parts:
+            continue
+        body = ''.join(p.capitalize() for p in parts)
+        tag = '#' + body
+        if tag not in derived:
+            derived.append(tag)
+        # add a safe variant if space allows
+        if variants and len(derived) < limit:
+            variant = tag + 'Tips'
+            if variant not in derived:
+                derived.append(variant)
+        if len(derived) >= limit:
+            break
+    return derived[:limit]
+
+def finalize_hashtags(raw_tags, keywords):
+    """
+    Clean and dedupe raw LLM hashtags and check they are grounded in `keywords`.
+    Falls back to hashtags derived deterministically from the keywords if too
+    few of the LLM's tags match. Returns at most 20 hashtags.
+    """
+    cleaned = []
+    for rt in raw_tags:
+        h = _clean_hashtag(rt)
+        if h and h not in cleaned:
+            cleaned.append(h)
+
+    # Validate grounding: at least some hashtags should contain tokens from keywords
+    kw_tokens = _keywords_tokens(keywords)
+    def _matches_keywords(hashtag):
+        low = hashtag.lstrip('#').lower()
+        for t in kw_tokens:
+            if t in low:
+                return True
+        return False
+
+    matched = sum(1 for h in cleaned if _matches_keywords(h))
+    # If too few matches, fallback to deterministic generation from keywords
+    min_needed = max(3, int(len(cleaned) * 0.3))
+    if matched < min_needed:
+        # Deterministic fallback: derive hashtags from keywords
+        return keyword_hashtags(keywords, variants=True)
+
+    return cleaned[:20]
+
+def generate_hashtags(keywords):
+    """
+    Generate 20 professional, SEO-friendly hashtags using Gemini API, using both keywords and cleaned HTML content.
+    """
+    # Accept both keywords and content
+    if isinstance(keywords, tuple) and len(keywords) == 2:
+        keywords, content = keywords
+    else:
+        content = ""
+    prompt = _KEYWORDS_PROMPT.format_map({"keywords": ", ".join(keywords), "content": content})
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(prompt, generation_config={"temperature": 0})
-        raw_tags = [t for t in response.text.split(',')]
-        cleaned = []
-        for rt in raw_tags:
-            h = _clean_hashtag(rt)
-            if h and h not in cleaned:
-                cleaned.append(h)
-
-        # Validate grounding: at least some hashtags should contain tokens from keywords
-        kw_tokens = _keywords_tokens(keywords)
-        def _matches_keywords(hashtag):
-            low = hashtag.lstrip('#').lower()
-            for t in kw_tokens:
-                if t in low:
-                    return True
-            return False
-
-        matched = sum(1 for h in cleaned if _matches_keywords(h))
-        # If too few matches, fallback to deterministic generation from keywords
-        min_needed = max(3, int(len(cleaned) * 0.3))
-        if matched < min_needed:
-            # Deterministic fallback: derive hashtags from keywords
-            derived = []
-            import re
-            for k in keywords:
-                if not isinstance(k, str):
-                    continue
-                parts = re.findall(r"[A-Za-z0-9]+", k)
-                if not parts:
-                    continue
-                body = ''.join(p.capitalize() for p in parts)
-                tag = '#' + body
-                if tag not in derived:
-                    derived.append(tag)
-                # add a safe variant if space allows
-                if len(derived) < 20:
-                    variant = '#' + body + 'Tips'
-                    if variant not in derived:
-                        derived.append(variant)
-                if len(derived) >= 20:
-                    break
-            return derived[:20]
-
-        return cleaned[:20]
+        response = get_model().generate_content(prompt, generation_config=_GENERATION_CONFIG)
+        return finalize_hashtags(response.text.split(','), keywords)
     except Exception as e:
         print(f"Gemini hashtag generation error: {e}")
         # deterministic fallback on error
-        derived = []
-        import re
-        for k in keywords:
-            if not isinstance(k, str):
-                continue
-            parts = re.findall(r"[A-Za-z0-9]+", k)
-            if not parts:
-                continue
-            body = ''.join(p.capitalize() for p in parts)
-            tag = '#' + body
-            if tag not in derived:
-                derived.append(tag)
-            if len(derived) >= 20:
-                break
-        return derived[:20]
+        return keyword_hashtags(keywords)
+
+async def generate_hashtags_from_content_async(content):
+    """
+    Generate hashtags from the Page Content alone (the model picks the key topics
+    itself), so this can run concurrently with keyword extraction.
+    Returns the raw comma-split tags; ground them with `finalize_hashtags` once the
+    keywords are known. Returns [] on error.
+    """
+    prompt = _CONTENT_PROMPT.format_map({"content": content})
+    try:
+        response = await get_model().generate_content_async(prompt, generation_config=_GENERATION_CONFIG)
+        return response.text.split(',')
+    except Exception as e:
+        print(f"Gemini hashtag generation error: {e}")
+        return []
+
+def _select_prompt(trending_hashtags, keywords, content):
+    return _SELECT_PROMPT.format_map({
+        "trending": ", ".join(trending_hashtags),
+        "keywords": ", ".join(keywords),
+        "content": content,
+    })
+
+def _parse_selection(text):
+    # Drop all whitespace in one pass, then split and ensure a single leading '#'
+    return ['#' + t.lstrip('#') for t in _WS_RE.sub('', text).split(',') if t][:20]
+
+def select_top_hashtags(trending_hashtags, keywords, content, use_cache=True):
+    """
+    Use Gemini to select the 20 most relevant of `trending_hashtags` (falls back to
+    the first 20). Answers are kept in the response cache; with `use_cache` False
+    it is not read (a fresh answer still refreshes it).
+    """
+    prompt = _select_prompt(trending_hashtags, keywords, content)
+    cache_key = response_cache_key(prompt)
+    cache = get_response_cache()
+    hit = cache.get(cache_key) if use_cache else None
+    if hit is not None:
+        return hit
+    try:
+        response = get_model().generate_content(prompt, generation_config=_GENERATION_CONFIG)
+        hashtags_llm = _parse_selection(response.text)
+        if hashtags_llm:
+            cache.set(cache_key, hashtags_llm)
+        return hashtags_llm
+    except Exception as e:
+        print(f"Gemini LLM hashtag selection error: {e}")
+        return trending_hashtags[:20]
+
+async def select_top_hashtags_async(trending_hashtags, keywords, content, use_cache=True):
+    """Async variant of `select_top_hashtags` (generate_content_async)."""
+    prompt = _select_prompt(trending_hashtags, keywords, content)
+    cache_key = response_cache_key(prompt)
+    cache = get_response_cache()
+    hit = cache.get(cache_key) if use_cache else None
+    if hit is not None:
+        return hit
+    try:
+        response = await get_model().generate_content_async(prompt, generation_config=_GENERATION_CONFIG)
+        hashtags_llm = _parse_selection(response.text)
+        if hashtags_llm:
+            cache.set(cache_key, hashtags_llm)
+        return hashtags_llm
+    except Exception as e:
+        print(f"Gemini LLM hashtag selection error: {e}")
+        return trending_hashtags[:20]
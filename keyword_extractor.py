@@ -1,28 +1,14 @@
-import google.generativeai as genai
-import os
 from dotenv import load_dotenv
+from config import GEMINI_MAX_OUTPUT_TOKENS
+from gemini_cache import get_cached_model, get_model, get_response_cache, response_cache_key
 
-# Load environment variables from .env file and configure Gemini API
+# Load environment variables from .env file
 load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-def extract_keywords(content):
-    """
-    Extracts the most important, high-value SEO keywords from content using Gemini API.
-    """
-    prompt = f"""
-You are an expert SEO auditor and content strategist working to meet company standards for digital marketing and SEO audits.
-Your task is to extract the most important, high-value, and SEO-relevant keywords from the provided company content for an SEO audit report.
-
-Guidelines:
-- Only extract keywords and key phrases that are highly relevant to the main topic and business context.
-- Avoid generic, filler, or overly broad terms (e.g., 'data', 'business', 'company').
-- Include both single-word and multi-word phrases that are suitable for hashtags, search optimization, and professional reporting.
-- Rank keywords by importance and specificity to the content.
-- Output a comma-separated list of 15-20 keywords or key phrases, with no extra text.
+_GENERATION_CONFIG = {"temperature": 0, "max_output_tokens": GEMINI_MAX_OUTPUT_TOKENS}
 
-Few-shot examples:
-Input: Content: Tata Consultancy Services (TCS) is an Indian multinational information technology (IT) services and consulting company headquartered in Mumbai, India. TCS is a part of the Tata Group and operates in 46 countries.
+# Few-shot examples shared by every keyword-extraction prompt
+KEYWORD_FEW_SHOTS = """Input: Content: Tata Consultancy Services (TCS) is an Indian multinational information technology (IT) services and consulting company headquartered in Mumbai, India. TCS is a part of the Tata Group and operates in 46 countries.
 Output: Tata Consultancy Services, TCS, IT services, consulting, Tata Group, multinational IT, digital transformation, technology consulting, Mumbai, global IT solutions, business process outsourcing, enterprise technology, software services, IT consulting, Indian IT company
 
 Input: Content: This page is about enterprise SEO audits and digital marketing analytics for large companies.
@@ -37,15 +23,77 @@ Output: cloud computing, artificial intelligence, cybersecurity, enterprise clie
 Input: Content: This report covers the implementation of robotic process automation (RPA) and workflow optimization in financial services.
 Output: robotic process automation, RPA, workflow optimization, financial services, process automation, automation implementation, finance automation, workflow management, RPA solutions, business process automation, automation strategy, financial technology, workflow improvement, RPA deployment, finance workflow
 
-Input: Content:
+"""
+
+# Static part of the keyword prompt (instructions + few-shots); only the content tail varies
+KEYWORD_PREAMBLE = """
+You are an expert SEO auditor and content strategist working to meet company standards for digital marketing and SEO audits.
+Your task is to extract the most important, high-value, and SEO-relevant keywords from the provided company content for an SEO audit report.
+
+Guidelines:
+- Only extract keywords and key phrases that are highly relevant to the main topic and business context.
+- Avoid generic, filler, or overly broad terms (e.g., 'data', 'business', 'company').
+- Include both single-word and multi-word phrases that are suitable for hashtags, search optimization, and professional reporting.
+- Rank keywords by importance and specificity to the content.
+- Output a comma-separated list of 15-20 keywords or key phrases, with no extra text.
+
+Few-shot examples:
+""" + KEYWORD_FEW_SHOTS
+
+def _keyword_tail(content):
+    return f"""Input: Content:
 {content}
 Output:
 """
-    
+
+def _parse_keywords(text):
+    return [kw.strip() for kw in text.split(",") if kw.strip()]
+
+def extract_keywords(content, use_cache=True):
+    """
+    Extracts the most important, high-value SEO keywords from content using Gemini API.
+    With `use_cache` False the response cache is not read (a fresh answer still refreshes it).
+    """
+    tail = _keyword_tail(content)
+    cache_key = response_cache_key(KEYWORD_PREAMBLE + tail)
+    cache = get_response_cache()
+    hit = cache.get(cache_key) if use_cache else None
+    if hit is not None:
+        return hit
+    try:
+        cached = get_cached_model("keyword-extractor", KEYWORD_PREAMBLE)
+        if cached is not None:
+            response = cached.generate_content(tail, generation_config=_GENERATION_CONFIG)
+        else:
+            response = get_model().generate_content(KEYWORD_PREAMBLE + tail, generation_config=_GENERATION_CONFIG)
+        keywords = _parse_keywords(response.text)
+        if keywords:
+            cache.set(cache_key, keywords)
+        return keywords
+    except Exception as e:
+        print(f"Gemini keyword extraction error: {e}")
+        return []
+
+async def extract_keywords_async(content, use_cache=True):
+    """
+    Async variant of `extract_keywords` (generate_content_async), so callers can
+    overlap the Gemini round trip with other I/O.
+    """
+    tail = _keyword_tail(content)
+    cache_key = response_cache_key(KEYWORD_PREAMBLE + tail)
+    cache = get_response_cache()
+    hit = cache.get(cache_key) if use_cache else None
+    if hit is not None:
+        return hit
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(prompt, generation_config={"temperature": 0})
-        keywords = [kw.strip() for kw in response.text.split(",") if kw.strip()]
+        cached = get_cached_model("keyword-extractor", KEYWORD_PREAMBLE)
+        if cached is not None:
+            response = await cached.generate_content_async(tail, generation_config=_GENERATION_CONFIG)
+        else:
+            response = await get_model().generate_content_async(KEYWORD_PREAMBLE + tail, generation_config=_GENERATION_CONFIG)
+        keywords = _parse_keywords(response.text)
+        if keywords:
+            cache.set(cache_key, keywords)
         return keywords
     except Exception as e:
         print(f"Gemini keyword extraction error: {e}")
@@ -1,69 +1,78 @@
-from scraper import scrape_url
+from scraper import scrape_url_async
 # optional fallback scraper (non-fatal if missing)
 try:
     from fallback_scraper import scrape_url_fallback
 except Exception:
     scrape_url_fallback = None
-from keyword_extractor import extract_keywords
-from hashtag_generator import generate_hashtags
+from keyword_extractor import extract_keywords_async
+from hashtag_generator import (
+    finalize_hashtags, generate_hashtags, generate_hashtags_from_content_async,
+    select_top_hashtags_async,
+)
 from utils import save_json
-from apify_trending_for_hashtags import get_trending_hashtags_for_list
+from tools.dedupe_filter import normalize_item
+from apify_trending_for_hashtags import get_shared_client, get_trending_hashtags_for_list
+from combined_llm import generate_and_validate_hashtags
+import asyncio
+import json
 import os
+import sys
 from dotenv import load_dotenv
+# optional fast JSON codec (non-fatal if missing)
+try:
+    import orjson
+except Exception:
+    orjson = None
 
-def main(url, provided_keywords=None):
-    # Load environment variables
-    load_dotenv()
+# Load environment variables from .env file
+load_dotenv()
+
+def _print_json(obj):
+    """Pretty-print `obj` to stdout; orjson writes UTF-8 bytes straight to the buffer."""
+    if orjson is None:
+        print(json.dumps(obj, indent=4, ensure_ascii=False))
+        return
+    sys.stdout.flush()
+    sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+    sys.stdout.buffer.flush()
+
+async def main(url, provided_keywords=None):
     # Step 1: Scrape URL
-    content = scrape_url(url)
+    content = await scrape_url_async(url)
     if not content.strip():
         print("[INFO] Primary scraper returned empty or failed — attempting fallback scraper...")
         if scrape_url_fallback:
             try:
-                content = scrape_url_fallback(url)
+                # Runs its own event loop when httpx is installed, so keep it off this one
+                content = await asyncio.to_thread(scrape_url_fallback, url)
             except Exception as e:
                 print(f"[ERROR] Fallback scraper exception: {e}")
         if not content.strip():
             print("Error: No content could be scraped from the URL by either scraper. Please check the site or try another URL.")
             return
 
-    # Step 2: Get keywords
+    # Steps 2-3: Get keywords and generate hashtags. Without provided keywords the two
+    # Gemini calls are independent, so run them concurrently and ground afterwards.
+    apify_key = os.getenv("APIFY_API_TOKEN")
+    trending_hashtags = None
     if provided_keywords:
-        keywords = provided_keywords
+        keywords = [normalize_item(k) for k in provided_keywords]
+        if apify_key:
+            # Keywords are known up front: run Apify alongside Gemini hashtag generation
+            hashtags_gemini, trending_hashtags = await asyncio.to_thread(
+                generate_and_validate_hashtags, keywords, content, get_shared_client(apify_key)
+            )
+        else:
+            hashtags_gemini = await asyncio.to_thread(generate_hashtags, (keywords, content))
     else:
-        keywords = extract_keywords(content)
-
-    # Normalize helper: convert dict-like items to best readable string
-    def normalize_item(item):
-        # If already a string, return trimmed
-        if isinstance(item, str):
-            return item.strip()
-        # If dict, try common fields
-        if isinstance(item, dict):
-            for key in ("title", "text", "query", "q", "searchQuery"):
-                if key in item and isinstance(item[key], str) and item[key].strip():
-                    return item[key].strip()
-            # If URL present, try to extract 'q' param or path
-            if "url" in item and isinstance(item["url"], str):
-                try:
-                    from urllib.parse import urlparse, parse_qs
-                    p = urlparse(item["url"])
-                    qs = parse_qs(p.query)
-                    if "q" in qs and qs["q"]:
-                        return qs["q"][0]
-                except Exception:
-                    pass
-            # Fallback to string representation
-            return str(item)
-        # Other types: convert to string
-        return str(item)
-
-    # Convert and normalize keywords to readable strings
-    keywords = [normalize_item(k) for k in keywords]
-
-    # Step 3: Generate hashtags using Gemini LLM
-    hashtags_gemini = generate_hashtags((keywords, content))
-    hashtags_gemini = [normalize_item(h) for h in hashtags_gemini]
+        keywords, raw_hashtags = await asyncio.gather(
+            extract_keywords_async(content),
+            generate_hashtags_from_content_async(content),
+        )
+        # Keyword extraction already returns stripped strings; only coerce anything else
+        keywords = [k if type(k) is str else normalize_item(k) for k in keywords]
+        hashtags_gemini = finalize_hashtags(raw_hashtags, keywords)
+    hashtags_gemini = [h if type(h) is str else normalize_item(h) for h in hashtags_gemini]
 
     # --- Debug: show pipeline inputs ---
     print('\n=== Pipeline inputs (pre-Apify) ===')
@@ -72,42 +81,24 @@ def main(url, provided_keywords=None):
         print(f"  {i}. {k}")
 
     # Step 4: Use Apify to validate only the Gemini-generated hashtags
-    apify_key = os.getenv("APIFY_API_TOKEN")
-    trending_hashtags = []
-    if apify_key:
-        # Only use Gemini hashtags for Apify validation
-        query_list = [h.strip() for h in hashtags_gemini if isinstance(h, str) and h.strip()]
-        
-        print('\nSending Gemini hashtags to Apify for validation:')
-        for i, q in enumerate(query_list, 1):
-            print(f"  {i}. {q}")
+    if trending_hashtags is not None:
+        pass  # already validated alongside hashtag generation
+    elif apify_key:
+        # Only use Gemini hashtags for Apify validation (deduped, order kept)
+        query_list = list(dict.fromkeys(h.strip() for h in hashtags_gemini if isinstance(h, str) and h.strip()))
+
+        trending_hashtags = []
+        if query_list:
+            print('\nSending Gemini hashtags to Apify for validation:')
+            for i, q in enumerate(query_list, 1):
+                print(f"  {i}. {q}")
 
-        trending_hashtags = get_trending_hashtags_for_list(query_list)
+            trending_hashtags = await asyncio.to_thread(get_trending_hashtags_for_list, query_list)
+    else:
+        trending_hashtags = []
     # Step 5: Use Gemini LLM to select the top 20 most relevant trending hashtags
     if trending_hashtags:
-        def select_top_hashtags(trending_hashtags, keywords, content):
-            import google.generativeai as genai
-            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-            prompt = (
-                "You are an expert SEO auditor and social media strategist.\n"
-                "Given the following list of trending hashtags, keywords, and company page content, "
-                "select the 20 most relevant, currently trending hashtags for a company SEO audit report.\n"
-                "All hashtags must meet company standards: professional, SEO-friendly, and suitable for enterprise use.\n"
-                "Avoid generic, unrelated, or overused hashtags.\n"
-                "Return only the hashtags, separated by commas, no extra text.\n\n"
-                f"Trending Hashtags:\n{', '.join(trending_hashtags)}\n\n"
-                f"Keywords:\n{', '.join(keywords)}\n\n"
-                f"Page Content:\n{content}\n"
-            )
-            try:
-                model = genai.GenerativeModel('gemini-2.5-flash')
-                response = model.generate_content(prompt, generation_config={"temperature": 0})
-                hashtags_llm = [tag.strip().replace(' ', '') if tag.strip().startswith('#') else '#' + tag.strip().replace(' ', '') for tag in response.text.split(",") if tag.strip()]
-                return hashtags_llm[:20]
-            except Exception as e:
-                print(f"Gemini LLM hashtag selection error: {e}")
-                return trending_hashtags[:20]
-        trending_hashtags = select_top_hashtags(trending_hashtags, keywords, content)
+        trending_hashtags = await select_top_hashtags_async(trending_hashtags, keywords, content)
     else:
         print("Warning: No trending hashtags found from SerpApi.")
 
@@ -122,8 +113,7 @@ def main(url, provided_keywords=None):
     save_json(result)
 
     # Also print to console
-    import json
-    print(json.dumps(result, indent=4, ensure_ascii=False))
+    _print_json(result)
 
 if __name__ == "__main__":
     # Load environment variables
@@ -135,4 +125,4 @@ if __name__ == "__main__":
         user_keywords = [kw.strip() for kw in keywords_input.split(",")]
     else:
         user_keywords = None
-    main(url, user_keywords)
\ No newline at end of file
+    asyncio.run(main(url, user_keywords))
\ No newline at end of file
@@ -1,27 +1,117 @@
-import requests
+import httpx
 from bs4 import BeautifulSoup
 
+# optional C-backed HTML parser (non-fatal if missing; falls back to BeautifulSoup).
+# Lexbor backend: selectolax.parser (Modest) is deprecated and gone in selectolax 1.0
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except Exception:
+    HTMLParser = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    _HTTP2 = True
+except Exception:
+    _HTTP2 = False
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+TIMEOUT = 10
+
+# Keep-alive pool shared by every blocking `scrape_url` call, so repeat scrapes
+# of the same host skip the TCP/TLS handshake. httpx only, for both the blocking
+# and the async path, so the two behave the same (redirects, decoding, HTTP/2)
+_CLIENT = httpx.Client(
+    http2=_HTTP2,
+    timeout=TIMEOUT,
+    headers=HEADERS,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+)
+
+
+_HEADING_TAGS = frozenset(("h1", "h2", "h3", "h4", "h5", "h6"))
+# Headings, paragraphs and the meta description, matched in one DOM traversal
+# (Lexbor returns grouped-selector matches in document order, like find_all)
+_CONTENT_SELECTOR = 'h1, h2, h3, h4, h5, h6, p, meta[name="description"]'
+_CONTENT_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6", "p", "meta"]
+
+
+def _extract_content(html):
+    """
+    Clean text from headings, paragraphs, and the meta description of `html`.
+    Pass decoded text (`response.text`): Lexbor reads raw bytes as UTF-8 regardless
+    of the page's declared charset.
+    """
+    headings, paragraphs, meta_desc = [], [], ""
+    if HTMLParser is not None:
+        for node in HTMLParser(html).css(_CONTENT_SELECTOR):
+            tag = node.tag
+            if tag == "p":
+                paragraphs.append(node.text(separator=" ", strip=True))
+            elif tag in _HEADING_TAGS:
+                headings.append(node.text(separator=" ", strip=True))
+            elif not meta_desc:
+                meta_desc = node.attributes.get("content") or ""
+        return " ".join([" ".join(headings), " ".join(paragraphs), meta_desc])
+
+    soup = BeautifulSoup(html, "html.parser")
+    for node in soup.find_all(_CONTENT_TAGS):
+        if node.name == "p":
+            paragraphs.append(node.get_text(separator=" ", strip=True))
+        elif node.name in _HEADING_TAGS:
+            headings.append(node.get_text(separator=" ", strip=True))
+        elif not meta_desc and node.get("name") == "description":
+            meta_desc = node.get("content", "")
+    # Combine all content
+    return " ".join([" ".join(headings), " ".join(paragraphs), meta_desc])
+
+
+def new_async_client():
+    """
+    Shared-pool httpx client for `scrape_url_async` (HTTP/2 when h2 is installed).
+    Create one per batch of URLs and pass it to each call.
+    """
+    return httpx.AsyncClient(http2=_HTTP2, timeout=TIMEOUT, headers=HEADERS, follow_redirects=True)
+
+
+async def scrape_url_async(url, client=None):
+    """
+    Async `scrape_url` over httpx. Pass a client from `new_async_client()` to reuse
+    its connection pool across URLs; without one a client is created for this call.
+    """
+    if client is None:
+        async with new_async_client() as own_client:
+            return await scrape_url_async(url, own_client)
+
+    try:
+        response = await client.get(url)
+        print(f"[DEBUG] HTTP status: {response.status_code}")
+        if response.status_code != 200:
+            print(f"[ERROR] Failed to fetch URL: {url} (HTTP {response.status_code})")
+            return ""
+        content = _extract_content(response.text)
+        if not content.strip():
+            print(f"[WARNING] No content extracted from: {url}")
+        return content
+    except Exception as e:
+        print(f"[ERROR] Exception during scraping {url}: {e}")
+        return ""
+
+
 def scrape_url(url):
     """
     Fetch and clean content from a URL.
     Returns clean text from headings, paragraphs, and meta tags.
+    Connections are reused across calls through a module-level httpx.Client;
+    async callers should use `scrape_url_async` with a shared httpx client instead.
     """
     try:
-        response = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
+        response = _CLIENT.get(url)
         print(f"[DEBUG] HTTP status: {response.status_code}")
         if response.status_code != 200:
             print(f"[ERROR] Failed to fetch URL: {url} (HTTP {response.status_code})")
             return ""
-        soup = BeautifulSoup(response.text, "html.parser")
-        # Extract headings
-        headings = " ".join([h.get_text(separator=" ", strip=True) for h in soup.find_all(['h1','h2','h3','h4','h5','h6'])])
-        # Extract paragraphs
-        paragraphs = " ".join([p.get_text(separator=" ", strip=True) for p in soup.find_all('p')])
-        # Extract meta description
-        meta = soup.find("meta", attrs={"name": "description"})
-        meta_desc = meta["content"] if meta and "content" in meta.attrs else ""
-        # Combine all content
-        content = " ".join([headings, paragraphs, meta_desc])
+        content = _extract_content(response.text)
         if not content.strip():
             print(f"[WARNING] No content extracted from: {url}")
         return content
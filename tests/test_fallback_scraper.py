@@ -0,0 +1,73 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Ensure project root is on sys.path so local modules can be imported
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+
+import fallback_scraper
+
+
+class ExtractTextTest(unittest.TestCase):
+    def test_selectolax_backend_available(self):
+        # requirements.txt installs selectolax; a None here means the import is broken
+        # and extraction silently runs on BeautifulSoup
+        self.assertIsNotNone(fallback_scraper.HTMLParser)
+
+    def test_prefers_article_and_drops_noise(self):
+        html = (
+            "<html><body><script>var x = 1;</script>"
+            "<article><h2>Title</h2><p>First paragraph.</p></article>"
+            "<p>Outside.</p></body></html>"
+        )
+        self.assertEqual(fallback_scraper.extract_text_from_html(html), "Title\n\nFirst paragraph.")
+
+    def test_selectolax_matches_bs4(self):
+        html = (
+            "<html><head><meta name='description' content='Desc'></head><body>"
+            "<div><p>One</p><div><p>Two</p></div></div><footer><p>Foot</p></footer>"
+            "</body></html>"
+        )
+        self.assertEqual(fallback_scraper._extract_text_selectolax(html), fallback_scraper._extract_text_bs4(html))
+
+
+class ScrapeFallbackTest(unittest.TestCase):
+    def test_blocking_path_uses_shared_client(self):
+        # 403 for the first User-Agent, a real page for the second, both on the pooled client
+        article = "<html><body><article><p>" + "Readable text. " * 10 + "</p></article></body></html>"
+        seen = []
+
+        def handler(request):
+            seen.append(request.headers["User-Agent"])
+            if len(seen) == 1:
+                return httpx.Response(403)
+            return httpx.Response(200, text=article, headers={"Content-Type": "text/html"})
+
+        client = httpx.Client(transport=httpx.MockTransport(handler), follow_redirects=True)
+        with mock.patch.object(fallback_scraper, "_CLIENT", client), mock.patch.object(fallback_scraper.time, "sleep") as sleep:
+            text = fallback_scraper.scrape_url_fallback("example.com", use_selenium_if_needed=False)
+        self.assertTrue(text.startswith("Readable text."))
+        self.assertEqual(len(seen), 2)
+        self.assertNotEqual(seen[0], seen[1])
+        # a 403 is retried with the next User-Agent without waiting
+        sleep.assert_not_called()
+
+    def test_backs_off_only_between_transient_failures(self):
+        def handler(request):
+            raise httpx.ConnectError("refused", request=request)
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with mock.patch.object(fallback_scraper, "_CLIENT", client), mock.patch.object(fallback_scraper.time, "sleep") as sleep:
+            text = fallback_scraper.scrape_url_fallback("example.com", max_attempts=3, use_selenium_if_needed=False)
+        self.assertEqual(text, "")
+        # no sleep after the last attempt
+        self.assertEqual(sleep.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
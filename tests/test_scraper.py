@@ -0,0 +1,66 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Ensure project root is on sys.path so local modules can be imported
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import scraper
+
+PAGE = (
+    "<html><head><meta name='description' content='Desc'></head><body>"
+    "<h2>H2first</h2><p>Para <b>one</b></p><h1>H1second</h1><p>Para two</p>"
+    "</body></html>"
+)
+EXPECTED = "H2first H1second Para one Para two Desc"
+
+
+class ExtractContentTest(unittest.TestCase):
+    def test_selectolax_backend_available(self):
+        self.assertIsNotNone(scraper.HTMLParser)
+
+    def test_mixed_heading_order_selectolax(self):
+        # headings keep document order, not selector order
+        self.assertEqual(scraper._extract_content(PAGE), EXPECTED)
+
+    def test_mixed_heading_order_bs4(self):
+        with mock.patch.object(scraper, "HTMLParser", None):
+            self.assertEqual(scraper._extract_content(PAGE), EXPECTED)
+
+
+
+LATIN1_PAGE = "<html><body><h1>Café</h1><p>naïve crème</p></body></html>".encode("latin-1")
+
+
+class ScrapeEncodingTest(unittest.TestCase):
+    def test_latin1_page_uses_declared_charset(self):
+        import httpx
+
+        def handler(request):
+            return httpx.Response(200, content=LATIN1_PAGE,
+                                  headers={"Content-Type": "text/html; charset=ISO-8859-1"})
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await scraper.scrape_url_async("http://example.test/", client)
+
+        self.assertEqual(asyncio.run(run()).strip(), "Café naïve crème")
+
+    def test_blocking_path_matches_async(self):
+        import httpx
+
+        def handler(request):
+            return httpx.Response(200, content=LATIN1_PAGE,
+                                  headers={"Content-Type": "text/html; charset=ISO-8859-1"})
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with mock.patch.object(scraper, "_CLIENT", client):
+            self.assertEqual(scraper.scrape_url("http://example.test/").strip(), "Café naïve crème")
+
+
+if __name__ == "__main__":
+    unittest.main()
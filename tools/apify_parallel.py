@@ -0,0 +1,230 @@
+"""
+apify_parallel.py
+
+Parallel Apify requester used by integration_example.get_trending_hashtags_with_tools.
+
+Each query is one synchronous actor run via Apify's run-sync-get-dataset-items
+endpoint; the response body is the run's dataset items. All queries are issued
+from a single asyncio event loop over one httpx.AsyncClient (HTTP/2 when h2 is
+installed), bounded by a semaphore, so hundreds of in-flight queries cost no
+threads. Without httpx it falls back to a thread pool over a requests.Session.
+
+Pass `qpm` to stay under the account's requests-per-minute budget: request starts
+are metered through an AsyncLeakyBucket instead of bursting into 429s. HTTP
+429/503 responses are retried (bounded) after the server's Retry-After, or a
+jittered exponential backoff when it doesn't send one.
+
+Identical queries already in flight (from any caller, thread or event loop in this
+process) are not sent again: later callers wait on the first request's result.
+
+Functions:
+- fetch_all_parallel_async(queries, api_key, max_concurrency=32, qpm=None): async, returns {query: items or None}
+- fetch_all_parallel(queries, api_key, max_workers=6, qpm=None): sync wrapper (same return value)
+- AsyncLeakyBucket(rate_per_sec, capacity): async rate limiter (`async with bucket: ...`)
+
+Adjust APIFY_ENDPOINT and build_payload to match your project.
+Defensive: failed calls map to None and never raise.
+
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+# optional async HTTP client (non-fatal if missing; falls back to requests + threads)
+try:
+    import httpx
+except Exception:
+    httpx = None
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    _HTTP2 = True
+except Exception:
+    _HTTP2 = False
+
+logger = logging.getLogger(__name__)
+
+APIFY_ENDPOINT = "https://api.apify.com/v2/acts/apify~google-search-scraper/run-sync-get-dataset-items"
+DEFAULT_TIMEOUT = 120
+# Retries for rate-limited / unavailable responses (429, 503)
+RETRY_STATUSES = (429, 503)
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_CAP_SECONDS = 30
+
+# Single-flight map: (api_key, search text) -> Future of the request in flight.
+# concurrent.futures (not asyncio) futures so callers on other threads/loops can wait too.
+_inflight: Dict[Tuple[str, str], Future] = {}
+_inflight_lock = threading.Lock()
+
+
+class AsyncLeakyBucket:
+    """
+    Token bucket for asyncio code: up to `capacity` calls may start back to back,
+    after which starts are spaced at `rate_per_sec`. Waiters are served in order.
+    Create it inside the event loop that uses it.
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: int = 1):
+        self.rate = float(rate_per_sec)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _search_text(query: str) -> str:
+    return f"trending hashtags for {query.lstrip('#').strip()}"
+
+
+def build_payload(query: str) -> dict:
+    """Google Search Scraper run input for one query."""
+    return {
+        "queries": _search_text(query),
+        "maxPagesPerQuery": 1,
+        "languageCode": "en",
+        "mobileResults": False,
+        "includeUnfilteredResults": True,
+    }
+
+
+def _headers(api_key: str) -> dict:
+    return {"Authorization": f"Bearer {api_key}"}
+
+
+def _retry_delay(resp, attempt: int) -> float:
+    """
+    Seconds to wait before retrying `resp`: its Retry-After if numeric (capped at
+    BACKOFF_CAP_SECONDS so a huge header can't stall the batch), else full-jitter backoff.
+    """
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(max(0.0, float(retry_after)), BACKOFF_CAP_SECONDS)
+        except ValueError:
+            pass  # HTTP-date form; use our own backoff
+    return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+async def fetch_for_query_async(client, api_key: str, query: str, timeout: int = DEFAULT_TIMEOUT,
+                                bucket: Optional[AsyncLeakyBucket] = None) -> Optional[Any]:
+    """
+    Run the actor for one query; returns its dataset items or None on failure.
+    Each attempt waits for `bucket` when given; 429/503 are retried up to MAX_RETRIES times.
+    """
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            if bucket is not None:
+                await bucket.acquire()
+            resp = await client.post(APIFY_ENDPOINT, json=build_payload(query), headers=_headers(api_key), timeout=timeout)
+            if resp.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                delay = _retry_delay(resp, attempt)
+                logger.info(f"Apify returned {resp.status_code} for {query!r}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            resp.raise_for_status()
+            return resp.json()
+    except Exception as e:
+        logger.warning(f"Apify request failed for {query!r}: {e}")
+    return None
+
+
+async def fetch_all_parallel_async(queries: List[str], api_key: str, max_concurrency: int = 32,
+                                   timeout: int = DEFAULT_TIMEOUT, qpm: Optional[float] = None) -> Dict[str, Optional[Any]]:
+    """
+    Fetch all `queries` concurrently (at most `max_concurrency` in flight).
+    With `qpm`, request starts are additionally limited to that many per minute.
+    """
+    if not queries:
+        return {}
+    sem = asyncio.Semaphore(max_concurrency)
+    limits = httpx.Limits(max_connections=max_concurrency)
+    bucket = AsyncLeakyBucket(qpm / 60.0) if qpm else None
+
+    async with httpx.AsyncClient(http2=_HTTP2, limits=limits) as client:
+        async def _one(q):
+            key = (api_key, _search_text(q))
+            with _inflight_lock:
+                fut = _inflight.get(key)
+                leader = fut is None
+                if leader:
+                    fut = _inflight[key] = Future()
+            if not leader:
+                return await asyncio.wrap_future(fut)
+
+            res = None
+            try:
+                async with sem:
+                    res = await fetch_for_query_async(client, api_key, q, timeout, bucket)
+                return res
+            finally:
+                with _inflight_lock:
+                    _inflight.pop(key, None)
+                fut.set_result(res)
+
+        results = await asyncio.gather(*(_one(q) for q in queries), return_exceptions=True)
+
+    return {q: (None if isinstance(r, BaseException) else r) for q, r in zip(queries, results)}
+
+
+def _fetch_all_threaded(queries: List[str], api_key: str, max_workers: int, timeout: int) -> Dict[str, Optional[Any]]:
+    session = requests.Session()
+
+    def _one(q):
+        try:
+            resp = session.post(APIFY_ENDPOINT, json=build_payload(q), headers=_headers(api_key), timeout=timeout)
+            resp.raise_for_status()
+            return resp.json()
+        except Exception as e:
+            logger.warning(f"Apify request failed for {q!r}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+        return dict(zip(queries, ex.map(_one, queries)))
+
+
+def fetch_all_parallel(queries: List[str], api_key: str, max_workers: int = 6,
+                       timeout: int = DEFAULT_TIMEOUT, qpm: Optional[float] = None) -> Dict[str, Optional[Any]]:
+    """
+    Sync wrapper around `fetch_all_parallel_async`; `max_workers` bounds concurrency.
+    `qpm` is only enforced on the httpx path.
+    """
+    if not queries:
+        return {}
+    if httpx is None:
+        return _fetch_all_threaded(queries, api_key, max_workers, timeout)
+    return asyncio.run(fetch_all_parallel_async(queries, api_key, max_concurrency=max_workers, timeout=timeout, qpm=qpm))
+
+
+# CLI demo
+if __name__ == '__main__':
+    import json
+    import os
+    key = os.getenv('APIFY_API_TOKEN') or 'demo_key'
+    out = fetch_all_parallel(["SEO", "content marketing"], key, max_workers=2)
+    print(json.dumps({q: (len(v) if isinstance(v, list) else v) for q, v in out.items()}, indent=2))
@@ -3,9 +3,14 @@ cache.py
 
 A simple file-based cache with TTL, safe and small. Use this to cache Apify responses keyed by query.
 
+Entries live in a single SQLite file (WAL mode): a get is one indexed lookup and a
+set writes one row, instead of re-reading/re-writing a whole JSON document.
+Values must be JSON-serializable. A legacy JSON store found at `path` is imported
+on first open (the original is kept as `<path>.bak`).
+
 Usage:
 from tools.cache import FileCache
-cache = FileCache('tools/cache_store.json', default_ttl=86400)
+cache = FileCache('tools/cache_store.sqlite', default_ttl=86400)
 val = cache.get('marketing')
 if val is None:
     val = expensive_request('marketing')
@@ -14,70 +19,117 @@ if val is None:
 """
 import json
 import os
+import sqlite3
+import threading
 import time
-from typing import Any, Optional
+from typing import Any, Iterable, Optional, Tuple
+
+# optional fast JSON codec (non-fatal if missing)
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+_SQLITE_HEADER = b'SQLite format 3\x00'
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+def _loads(blob: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(blob)
+    return json.loads(blob)
 
 
 class FileCache:
     def __init__(self, path: str, default_ttl: int = 86400):
         self.path = path
         self.default_ttl = int(default_ttl)
-        self._data = None
-        self._load()
+        self._lock = threading.Lock()
+        legacy = self._read_legacy_json()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by all threads, serialized by self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v BLOB, expires_at REAL, created_at REAL)')
+        if legacy:
+            self._import(legacy)
 
-    def _load(self):
+    def _read_legacy_json(self) -> Optional[dict]:
+        """Move a pre-SQLite JSON store out of the way and return its records."""
         if not os.path.exists(self.path):
-            self._data = {}
-            return
+            return None
+        with open(self.path, 'rb') as f:
+            if f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER:
+                return None
         try:
             with open(self.path, 'r', encoding='utf-8') as f:
-                self._data = json.load(f)
+                data = json.load(f)
         except Exception:
-            self._data = {}
+            data = {}
+        os.replace(self.path, self.path + '.bak')
+        return data if isinstance(data, dict) else None
 
-    def _save(self):
-        tmp = self.path + '.tmp'
-        try:
-            with open(tmp, 'w', encoding='utf-8') as f:
-                json.dump(self._data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp, self.path)
-        except Exception:
-            pass
+    def _import(self, data: dict):
+        rows = [
+            (k, _dumps(rec.get('value')), rec.get('expires_at'), rec.get('created_at') or time.time())
+            for k, rec in data.items() if isinstance(rec, dict)
+        ]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            self._conn.executemany('INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)', rows)
+            self._conn.execute('COMMIT')
+
+    def _row(self, key: str, value: Any, ttl: Optional[int]) -> Tuple[str, bytes, Optional[float], float]:
+        if ttl is None:
+            ttl = self.default_ttl
+        now = time.time()
+        return (key, _dumps(value), now + int(ttl) if ttl > 0 else None, now)
 
     def get(self, key: str) -> Optional[Any]:
-        rec = self._data.get(key)
-        if not rec:
-            return None
-        if 'expires_at' in rec and rec['expires_at'] and rec['expires_at'] < time.time():
-            # expired
-            try:
-                del self._data[key]
-            except KeyError:
-                pass
-            self._save()
-            return None
-        return rec.get('value')
+        with self._lock:
+            row = self._conn.execute('SELECT v, expires_at FROM kv WHERE k = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            blob, expires_at = row
+            if expires_at and expires_at < time.time():
+                # expired
+                self._conn.execute('DELETE FROM kv WHERE k = ?', (key,))
+                return None
+        return _loads(blob)
 
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
-        if ttl is None:
-            ttl = self.default_ttl
-        rec = {
-            'value': value,
-            'expires_at': time.time() + int(ttl) if ttl > 0 else None,
-            'created_at': time.time()
-        }
-        self._data[key] = rec
-        self._save()
+        row = self._row(key, value, ttl)
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)', row)
+
+    def set_many(self, items: Iterable[Tuple[str, Any]], ttl: Optional[int] = None):
+        """Set several (key, value) pairs in one transaction."""
+        rows = [self._row(k, v, ttl) for k, v in items]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)', rows)
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
 
     def delete(self, key: str):
-        if key in self._data:
-            del self._data[key]
-            self._save()
+        with self._lock:
+            self._conn.execute('DELETE FROM kv WHERE k = ?', (key,))
 
 
 # quick demo
 if __name__ == '__main__':
-    c = FileCache('tools/cache_store.json', default_ttl=60)
+    c = FileCache('tools/cache_store.sqlite', default_ttl=60)
     print('set a')
     c.set('a', {'x': 1})
     print('get a', c.get('a'))
@@ -6,8 +6,10 @@ This module is safe, pure-Python, and has no external side effects.
 
 Functions:
 - normalize_text(s): lowercase, trim, remove extra spaces
+- normalize_item(item): best readable string for one pipeline item (str, dict, or anything else)
 - normalize_items(items): convert many input types to strings and normalize
-- dedupe_preserve_order(items): remove exact duplicates preserving order
+- iter_normalized(items): lazy generator version of normalize_items
+- dedupe_preserve_order(items, fuzzy=False): remove duplicates (case/Unicode-insensitive) preserving order
 - filter_generic(items, stop_words=None, min_len=2): remove overly generic or short tokens
 
 Usage:
@@ -15,51 +17,120 @@ Usage:
 
 """
 import re
-from typing import Iterable, List
+import unicodedata
+from typing import Any, Iterable, Iterator, List
+from urllib.parse import urlparse, parse_qs
+
+# optional C-backed fuzzy matcher for near-duplicate removal (non-fatal if missing)
+try:
+    from rapidfuzz import fuzz, process
+except Exception:
+    fuzz = process = None
 
 GENERIC_STOP_WORDS = {"the", "a", "an", "and", "or", "to", "in", "on", "for", "with", "of"}
 
+_WS_RE = re.compile(r"\s+")
+# Dict fields that hold an item's readable text, in order of preference
+_DICT_KEYS = ("title", "text", "query", "q", "searchQuery", "name")
+# rapidfuzz ratio (0-100) at or above which two items count as the same query
+FUZZY_SCORE_CUTOFF = 92
+
 
 def normalize_text(s: str) -> str:
-    s = s or ""
-    s = s.strip()
-    s = re.sub(r"\s+", " ", s)
-    return s
+    s = (s or "").strip()
+    # fast path: only plain single spaces inside (isprintable() is False for tabs,
+    # newlines and other Unicode whitespace), so there is nothing to collapse
+    if s.isprintable() and "  " not in s:
+        return s
+    return _WS_RE.sub(" ", s)
 
 
-def normalize_items(items: Iterable) -> List[str]:
-    out = []
+def _dict_text(d: dict):
+    """First non-blank string among _DICT_KEYS of `d`, stripped; None if there is none."""
+    for key in _DICT_KEYS:
+        v = d.get(key)
+        if type(v) is str:
+            v = v.strip()
+            if v:
+                return v
+    return None
+
+
+def normalize_item(item: Any) -> str:
+    """Convert dict-like items (e.g. Apify results) to a readable string."""
+    t = type(item)
+    if t is str:
+        return item.strip()
+    if t is dict:
+        text = _dict_text(item)
+        if text is not None:
+            return text
+        # If URL present, try to extract the 'q' param
+        url = item.get("url")
+        if type(url) is str:
+            try:
+                qs = parse_qs(urlparse(url).query)
+                if qs.get("q"):
+                    return qs["q"][0]
+            except Exception:
+                pass
+    return str(item)
+
+
+def iter_normalized(items: Iterable) -> Iterator[str]:
     for it in items:
         if it is None:
             continue
-        if isinstance(it, str):
-            t = normalize_text(it)
-            if t:
-                out.append(t)
-            continue
-        if isinstance(it, dict):
+        t = type(it)
+        if t is str:
+            s = normalize_text(it)
+            if s:
+                yield s
+        elif t is dict:
             # common fields
-            for key in ("title", "text", "query", "q", "searchQuery", "name"):
-                if key in it and isinstance(it[key], str) and it[key].strip():
-                    out.append(normalize_text(it[key]))
-                    break
-            else:
-                out.append(normalize_text(str(it)))
-            continue
-        # fallback
-        out.append(normalize_text(str(it)))
-    return out
+            text = _dict_text(it)
+            yield normalize_text(text if text is not None else str(it))
+        else:
+            # fallback (incl. str/dict subclasses)
+            yield normalize_text(str(it))
+
+
+def normalize_items(items: Iterable) -> List[str]:
+    return list(iter_normalized(items))
+
 
+def _dedupe_key(s: str) -> str:
+    return unicodedata.normalize("NFKC", s).casefold()
 
-def dedupe_preserve_order(items: Iterable[str]) -> List[str]:
+
+def dedupe_preserve_order(items: Iterable[str], *, fuzzy: bool = False) -> List[str]:
+    """
+    Drop duplicates, keeping the first occurrence (with its original casing).
+    Items are compared NFKC-normalized and casefolded, so "SEO" and "seo" collapse.
+    With `fuzzy`, near-duplicates (rapidfuzz ratio >= FUZZY_SCORE_CUTOFF) are
+    dropped too; ignored if rapidfuzz isn't installed.
+    """
     seen = set()
     out = []
+    keys = []
     for it in items:
-        if it in seen:
+        key = _dedupe_key(it)
+        if key in seen:
             continue
-        seen.add(it)
+        seen.add(key)
         out.append(it)
-    return out
+        keys.append(key)
+
+    if not fuzzy or process is None:
+        return out
+
+    kept, kept_keys = [], []
+    for it, key in zip(out, keys):
+        if kept_keys and process.extractOne(key, kept_keys, scorer=fuzz.ratio, score_cutoff=FUZZY_SCORE_CUTOFF):
+            continue
+        kept.append(it)
+        kept_keys.append(key)
+    return kept
 
 
 def filter_generic(items: Iterable[str], stop_words: Iterable[str] = None, min_len: int = 2) -> List[str]:
@@ -25,7 +25,7 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-def get_trending_hashtags_with_tools(raw_queries: List[str], api_key: str, cache_path: str = 'tools/cache_store.json', max_workers: int = 6, min_len: int = 2) -> Dict[str, Optional[dict]]:
+def get_trending_hashtags_with_tools(raw_queries: List[str], api_key: str, cache_path: str = 'tools/cache_store.sqlite', max_workers: int = 6, min_len: int = 2) -> Dict[str, Optional[dict]]:
     """Normalize, dedupe, cache-check, parallel-fetch, cache-store, and return mapping query->response.
 
     Returns a dict where each original normalized query maps to either the cached/fresh response (dict) or None if fetch failed.
@@ -60,13 +60,11 @@ def get_trending_hashtags_with_tools(raw_queries: List[str], api_key: str, cache
     fresh_results = {}
     if need_query:
         fresh_results = fetch_all_parallel(need_query, api_key, max_workers=max_workers)
-        # store successful results
-        for q, res in fresh_results.items():
-            if res is not None:
-                try:
-                    cache.set(q, res)
-                except Exception:
-                    logger.debug('Failed to cache result for ' + q)
+        # store successful results (one transaction)
+        try:
+            cache.set_many((q, res) for q, res in fresh_results.items() if res is not None)
+        except Exception:
+            logger.debug('Failed to cache fresh results')
 
     # 7. Merge and return
     merged = {**cached_results, **(fresh_results or {})}
@@ -82,6 +80,6 @@ if __name__ == '__main__':
     import os
     sample = ["SEO", "marketing", "content marketing", "SEO", "the"]
     key = os.getenv('APIFY_API_TOKEN') or 'demo_key'
-    out = get_trending_hashtags_with_tools(sample, key, cache_path='tools/cache_store.json', max_workers=4)
+    out = get_trending_hashtags_with_tools(sample, key, cache_path='tools/cache_store.sqlite', max_workers=4)
     import json
     print(json.dumps(out, indent=2))
@@ -1,8 +1,37 @@
+import hashlib
 import json
+import os
+
+# optional fast JSON codec (non-fatal if missing; falls back to stdlib json)
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 def save_json(output, filename="output.json"):
     """
     Save a dictionary as a JSON file.
+    Written to a temp file and renamed into place, so a crash mid-write never
+    leaves a truncated file behind.
+    """
+    if orjson is not None:
+        data = orjson.dumps(output, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(output, indent=4, ensure_ascii=False).encode("utf-8")
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, filename)
+
+def content_digest(text):
+    """
+    Short, stable fingerprint of `text` for use as a cache key.
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def dedupe_key(text):
+    """
+    8-byte blake2b digest of `text` for dedupe sets over long snippets
+    (fixed-size hashing/compares instead of full-string equality).
     """
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=4, ensure_ascii=False)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()